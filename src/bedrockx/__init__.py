@@ -2,6 +2,6 @@
 The caoyizhen_basetool library provides a tool to help you to dealing with data in Python.
 """
 
-from .file import read_file, save_file, add_suffix_file, return_to_jsonl, ReadFileExampleCallBack
-from .process import BaseMultiThreading, filter_fn, remove_columns, drop_duplicates
-from .utils import singleton, LoggerManager, base_logger
\ No newline at end of file
+from .file import read_file, iter_file, save_file, add_suffix_file, return_to_jsonl, ReadFileExampleCallBack, JsonlIndex, ShardedWriter, DiskCache, MemoryCache, JsonlFollower, follow_file, BackgroundWriter
+from .process import BaseMultiThreading, BaseAsyncProcessing, filter_fn, remove_columns, drop_duplicates
+from .utils import singleton, LoggerManager, base_logger, set_json_backend, get_json_backend
\ No newline at end of file
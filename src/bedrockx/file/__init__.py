@@ -1 +1,6 @@
-from .utils import read_file, save_file, return_to_jsonl, add_suffix_file, ReadFileExampleCallBack
\ No newline at end of file
+from .utils import read_file, iter_file, save_file, return_to_jsonl, add_suffix_file, ReadFileExampleCallBack
+from .jsonl_index import JsonlIndex
+from .sharded import ShardedWriter
+from .cache import DiskCache, MemoryCache
+from .follow import JsonlFollower, follow_file
+from .background_writer import BackgroundWriter
@@ -0,0 +1,145 @@
+# -*- encoding: utf-8 -*-
+# @Time    :   2026/10/17 18:48:30
+# @File    :   background_writer.py
+# @Author  :   ciaoyizhen
+# @Contact :   yizhen.ciao@gmail.com
+# @Function:   后台线程批量序列化并写入 jsonl，按条数/时间刷盘
+import os
+import time
+import queue
+import threading
+from typing import IO, Any, List, Optional, Union
+from .sharded import ShardedWriter
+from ..utils.json_codec import get_json_codec
+
+_STOP = object()
+
+
+class BackgroundWriter:
+    """
+    后台写入线程：调用方 put 数据，序列化、写入与刷盘都在后台线程中批量完成
+    - flush_every: 累计写入多少条后 flush
+    - flush_interval: 距离上次 flush 超过多少秒后 flush（队列空闲时同样生效）
+    - fsync: flush 后是否调用 os.fsync，保证数据落盘
+    写入线程出错后，之后的 put 与 close 会在调用方抛出 RuntimeError
+
+    用法：
+        with open("output.jsonl", "w") as f, BackgroundWriter(f, flush_every=1000) as writer:
+            for item in data:
+                writer.put(item)
+    """
+
+    def __init__(
+        self,
+        f: Union[IO[str], ShardedWriter],
+        *,
+        flush_every: int = 1000,
+        flush_interval: Optional[float] = 1.0,
+        fsync: bool = False,
+        ensure_ascii: bool = False,
+        max_queue: int = 10000,
+        batch_size: int = 1000,
+    ):
+        """
+        Args:
+            f (IO|ShardedWriter): 文本模式打开的文件或分片写入器
+            flush_every (int): 累计写入多少条后 flush，1 表示每条都 flush
+            flush_interval (float): 距离上次 flush 超过多少秒后 flush，None 表示不按时间 flush
+            fsync (bool): flush 后是否调用 os.fsync
+            ensure_ascii (bool): 是否转义非 ASCII 字符
+            max_queue (int): 队列长度上限，写入跟不上时 put 会阻塞
+            batch_size (int): 后台线程每次最多从队列取出并写入的条数
+        """
+        self.f = f
+        self.flush_every = max(1, flush_every)
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.ensure_ascii = ensure_ascii
+        self.batch_size = batch_size
+        self.written = 0
+        self._dumps = get_json_codec().dumps
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_queue)
+        self._error: Optional[BaseException] = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="后台写入线程", daemon=True)
+        self._thread.start()
+
+    def put(self, item: Any) -> None:
+        """提交一条待写入的数据"""
+        self._raise_if_failed()
+        self._queue.put(item)
+
+    def _raise_if_failed(self) -> None:
+        if self._error is not None:
+            raise RuntimeError(f"后台写入线程出错: {self._error!r}") from self._error
+
+    def _write(self, lines: List[str]) -> None:
+        if isinstance(self.f, ShardedWriter):
+            for line in lines:
+                self.f.write_line(line)
+        else:
+            self.f.write("".join(line + "\n" for line in lines))
+
+    def _flush(self) -> None:
+        self.f.flush()
+        if self.fsync:
+            os.fsync(self.f.fileno())
+
+    def _run(self) -> None:
+        unflushed = 0
+        last_flush = time.monotonic()
+        stopping = False
+        while not stopping:
+            # 等待数据，超时时检查是否需要按时间 flush
+            timeout = None
+            if unflushed and self.flush_interval is not None:
+                timeout = max(0.0, self.flush_interval - (time.monotonic() - last_flush))
+            try:
+                batch = [self._queue.get(timeout=timeout)]
+            except queue.Empty:
+                batch = []
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if batch and batch[-1] is _STOP:
+                batch.pop()
+                stopping = True
+
+            if self._error is not None:
+                # 出错后只消费队列，避免调用方在 put 时阻塞
+                continue
+            try:
+                if batch:
+                    self._write([self._dumps(item, self.ensure_ascii) for item in batch])
+                    self.written += len(batch)
+                    unflushed += len(batch)
+                timed_out = self.flush_interval is not None and time.monotonic() - last_flush >= self.flush_interval
+                if unflushed and (stopping or unflushed >= self.flush_every or timed_out):
+                    self._flush()
+                    unflushed = 0
+                    last_flush = time.monotonic()
+            except BaseException as e:
+                self._error = e
+
+    def close(self) -> None:
+        """写入队列中剩余的数据并 flush，等待后台线程结束"""
+        if not self._closed:
+            self._closed = True
+            self._queue.put(_STOP)
+            self._thread.join()
+        self._raise_if_failed()
+
+    def __enter__(self) -> "BackgroundWriter":
+        return self
+
+    def __exit__(self, exc_type, *exc) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            # 调用方已经出错时不掩盖原始异常
+            try:
+                self.close()
+            except RuntimeError:
+                pass
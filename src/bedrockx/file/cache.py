@@ -0,0 +1,371 @@
+# -*- encoding: utf-8 -*-
+# @Time    :   2026/10/17 17:20:44
+# @File    :   cache.py
+# @Author  :   ciaoyizhen
+# @Contact :   yizhen.ciao@gmail.com
+# @Function:   read_file 解析结果的磁盘缓存(pickle protocol 5 + mmap 加载)与进程内 LRU 缓存
+import os
+import re
+import sys
+import mmap
+import pickle
+import struct
+import hashlib
+import types
+import marshal
+import functools
+import threading
+from pathlib import Path
+from itertools import islice
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+from ..utils.log_manage import base_logger
+
+# 缓存文件头: magic, pickle 长度, 带外 buffer 个数；之后是每个 buffer 的长度
+_HEADER = struct.Struct("<8sQQ")
+_MAGIC = b"BRXCACH1"
+_ALIGN = 64
+# 估算内存占用时每个容器抽样的元素个数与递归深度
+_SIZE_SAMPLE = 64
+_SIZE_DEPTH = 3
+
+
+def _sha(data: Union[str, bytes]) -> str:
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+def _align(n: int) -> int:
+    return (n + _ALIGN - 1) // _ALIGN * _ALIGN
+
+
+def estimate_size(value: Any, depth: int = 0) -> int:
+    """
+    估算对象占用的内存字节数
+    DataFrame/arrow/numpy 使用自身的统计；list/dict/set 等容器抽样前 _SIZE_SAMPLE 个元素递归估算后按长度外推
+    """
+    memory_usage = getattr(value, "memory_usage", None)
+    if callable(memory_usage) and hasattr(value, "columns"):
+        return int(memory_usage(deep=True).sum())
+    nbytes = getattr(value, "nbytes", None)
+    if isinstance(nbytes, int):
+        return nbytes
+    size = sys.getsizeof(value)
+    if depth >= _SIZE_DEPTH or not isinstance(value, (list, tuple, set, frozenset, dict)) or not value:
+        return size
+    if isinstance(value, dict):
+        sample = [estimate_size(k, depth + 1) + estimate_size(v, depth + 1) for k, v in islice(value.items(), _SIZE_SAMPLE)]
+    else:
+        sample = [estimate_size(item, depth + 1) for item in islice(value, _SIZE_SAMPLE)]
+    return size + sum(sample) * len(value) // len(sample)
+
+
+# repr 中包含内存地址（如 <__main__.T object at 0x7f...>）时，跨进程不稳定，同一进程中地址也可能被复用
+_ADDRESS_RE = re.compile(r" at 0x[0-9a-fA-F]+")
+
+
+def _value_identity(value: Any, seen: Tuple[int, ...]) -> str:
+    """
+    闭包变量、默认参数、绑定对象等状态的稳定标识
+    repr 中不含内存地址时使用 repr，否则使用 pickle 的哈希，都不可用时抛出 RuntimeError
+    """
+    if isinstance(value, (types.FunctionType, types.MethodType, functools.partial)):
+        return callable_identity(value, _seen=seen)
+    text = repr(value)
+    if not _ADDRESS_RE.search(text):
+        return text
+    try:
+        return f"{type(value).__module__}.{type(value).__qualname__}:pickle:{_sha(pickle.dumps(value, protocol=5))}"
+    except Exception as e:
+        raise RuntimeError(f"无法为 {text[:200]} 生成稳定的缓存标识（repr 含内存地址且无法 pickle）") from e
+
+
+def callable_identity(fn: Optional[Callable], *, _seen: Tuple[int, ...] = ()) -> Optional[str]:
+    """
+    函数的稳定标识：模块名、qualname 与字节码哈希，默认参数、闭包变量与绑定方法的实例取 repr（含内存地址时取 pickle 哈希）
+    函数体、闭包变量或实例状态变化后标识随之变化；函数内部引用的全局变量不在标识内
+    无法生成稳定标识时（如 repr 为默认值且无法 pickle 的可调用对象）抛出 RuntimeError，调用方应放弃缓存
+    """
+    if fn is None:
+        return None
+    if id(fn) in _seen:
+        # 递归引用自身的闭包
+        return f"<recursive {getattr(fn, '__qualname__', type(fn).__qualname__)}>"
+    seen = _seen + (id(fn),)
+    if isinstance(fn, functools.partial):
+        args = _value_identity(fn.args, seen)
+        keywords = _value_identity(sorted(fn.keywords.items()), seen)
+        return f"partial({callable_identity(fn.func, _seen=seen)}, {args}, {keywords})"
+    bound_to = getattr(fn, "__self__", None)
+    if bound_to is not None and not isinstance(bound_to, types.ModuleType):
+        # 绑定方法会代理 __func__ 的 __code__，需要加上实例的状态，否则不同实例的方法标识相同
+        func = getattr(fn, "__func__", None)
+        name = callable_identity(func, _seen=seen) if func is not None else f"{type(bound_to).__qualname__}.{fn.__name__}"
+        return f"{name}@{_value_identity(bound_to, seen)}"
+    code = getattr(fn, "__code__", None)
+    if code is None:
+        call = getattr(type(fn), "__call__", None)
+        if isinstance(call, types.FunctionType):
+            # 定义了 __call__ 的可调用对象：__call__ 的代码加上对象的状态
+            return f"{callable_identity(call, _seen=seen)}@{_value_identity(fn, seen)}"
+        # 内置函数、类等
+        return _value_identity(fn, seen)
+    cells = [_value_identity(cell.cell_contents, seen) for cell in (fn.__closure__ or ())]
+    defaults = _value_identity(fn.__defaults__, seen)
+    return f"{fn.__module__}.{fn.__qualname__}:{_sha(marshal.dumps(code))}:{defaults}:{cells!r}"
+
+
+class DiskCache:
+    """
+    read_file 解析结果的磁盘缓存
+    key 由源文件的路径、大小、mtime_ns 与读取参数（包括 process_fn/where 的函数标识）组成，源文件变化后自动失效
+    使用 pickle protocol 5 序列化，numpy/arrow 等大块数组以带外 buffer 保存，加载时通过 mmap 零拷贝读取
+    超过 max_bytes 后按最近使用时间淘汰
+
+    用法：
+        cache = DiskCache("~/.cache/bedrockx", max_bytes=50 * 1024**3)
+        data = read_file("huge.jsonl", cache=cache)
+        cache.invalidate("huge.jsonl")
+    """
+
+    def __init__(self, cache_dir: Union[str, Path, None] = None, *, max_bytes: int = 10 * 1024 ** 3):
+        """
+        Args:
+            cache_dir (str|Path): 缓存目录，默认为 ~/.cache/bedrockx
+            max_bytes (int): 缓存目录的总大小上限
+        """
+        self.cache_dir = Path(cache_dir).expanduser() if cache_dir else Path.home() / ".cache" / "bedrockx"
+        self.max_bytes = max_bytes
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def _path_hash(file_name: Union[str, Path]) -> str:
+        return _sha(str(Path(file_name).resolve()))[:16]
+
+    def make_key(self, sources: List[Path], options: Dict[str, Any]) -> str:
+        """
+        生成缓存 key: `<路径哈希>-<文件状态哈希>-<参数哈希>`
+        同一路径的文件变化后，旧的缓存会在写入新缓存时删除
+        """
+        stats = []
+        for source in sources:
+            stat = source.stat()
+            stats.append((str(source.resolve()), stat.st_size, stat.st_mtime_ns))
+        path_hash = self._path_hash(sources[0]) if len(sources) == 1 else _sha(repr([s[0] for s in stats]))[:16]
+        return f"{path_hash}-{_sha(repr(stats))[:16]}-{_sha(repr(sorted(options.items())))[:32]}"
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.pkl"
+
+    def get(self, key: str) -> Any:
+        """读取缓存，不存在或损坏时返回 None"""
+        path = self._entry_path(key)
+        if not path.exists():
+            return None
+        try:
+            value = self._load(path)
+        except Exception as e:
+            base_logger.warning(f"缓存文件损坏，已删除: {path} ({e})")
+            path.unlink(missing_ok=True)
+            return None
+        # 更新时间作为 LRU 的依据
+        os.utime(path)
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        path = self._entry_path(key)
+        # 同一路径、不同文件状态的缓存已经过期
+        path_hash, stat_hash, _ = key.split("-")
+        for stale in self.cache_dir.glob(f"{path_hash}-*.pkl"):
+            if stale.name.split("-")[1] != stat_hash:
+                stale.unlink(missing_ok=True)
+
+        tmp_path = path.with_name(path.name + f".{os.getpid()}.tmp")
+        try:
+            self._dump(tmp_path, value)
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+        if path.stat().st_size > self.max_bytes:
+            base_logger.warning(f"缓存大小超过上限 {self.max_bytes} 字节，不缓存该结果")
+            path.unlink(missing_ok=True)
+            return
+        self._evict()
+
+    def _evict(self) -> None:
+        entries = []
+        for entry in self.cache_dir.glob("*.pkl"):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, entry))
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry in sorted(entries, key=lambda x: x[0]):
+            if total <= self.max_bytes:
+                break
+            entry.unlink(missing_ok=True)
+            total -= size
+
+    def invalidate(self, file_name: Union[str, Path, None] = None) -> int:
+        """
+        删除缓存，file_name 为 None 时清空所有缓存
+
+        Returns:
+            int: 删除的缓存个数
+        """
+        pattern = "*.pkl" if file_name is None else f"{self._path_hash(file_name)}-*.pkl"
+        count = 0
+        for entry in self.cache_dir.glob(pattern):
+            entry.unlink(missing_ok=True)
+            count += 1
+        return count
+
+    def size(self) -> int:
+        """当前缓存占用的字节数"""
+        return sum(entry.stat().st_size for entry in self.cache_dir.glob("*.pkl"))
+
+    @staticmethod
+    def _dump(path: Path, value: Any) -> None:
+        buffers = []
+
+        def buffer_callback(buffer: pickle.PickleBuffer) -> bool:
+            try:
+                buffer.raw()
+            except BufferError:
+                # 非连续内存无法带外保存，写入 pickle 流中
+                return True
+            buffers.append(buffer)
+            return False
+
+        payload = pickle.dumps(value, protocol=5, buffer_callback=buffer_callback)
+        raws = [buffer.raw() for buffer in buffers]
+        with path.open("wb") as f:
+            f.write(_HEADER.pack(_MAGIC, len(payload), len(raws)))
+            f.write(struct.pack(f"<{len(raws)}Q", *(raw.nbytes for raw in raws)))
+            f.write(payload)
+            # 带外 buffer 按 64 字节对齐，mmap 后可以直接作为数组内存
+            for raw in raws:
+                f.write(b"\0" * (_align(f.tell()) - f.tell()))
+                f.write(raw)
+
+    @staticmethod
+    def _load(path: Path) -> Any:
+        with path.open("rb") as f:
+            # ACCESS_COPY: 加载后的数组可写，修改不会写回缓存文件
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        view = memoryview(mm)
+        magic, payload_len, n_buffers = _HEADER.unpack_from(view)
+        if magic != _MAGIC:
+            raise ValueError("magic 不匹配")
+        lengths = struct.unpack_from(f"<{n_buffers}Q", view, _HEADER.size)
+        offset = _HEADER.size + 8 * n_buffers
+        payload = view[offset:offset + payload_len]
+        offset += payload_len
+        buffers = []
+        for length in lengths:
+            offset = _align(offset)
+            buffers.append(view[offset:offset + length])
+            offset += length
+        return pickle.loads(payload, buffers=buffers)
+
+
+class MemoryCache:
+    """
+    read_file 解析结果的进程内 LRU 缓存，线程安全
+    每次命中前通过 stat() 比较源文件的大小、mtime_ns 与 inode，源文件变化后重新读取
+    返回的是缓存中的同一个对象，调用方不应修改它
+
+    每个结果的占用由 estimate_size 抽样估算（而不是源文件大小，压缩文件或 dict 的内存可能远大于文件），
+    总和超过 max_bytes 后淘汰最久未使用的结果
+
+    用法：
+        blacklist = read_file("blacklist.jsonl", output_type="set", main_key_column="id", memo=True)
+    """
+
+    def __init__(self, max_bytes: int = 512 * 1024 ** 2):
+        """
+        Args:
+            max_bytes (int): 按 estimate_size 估算的结果内存总大小上限
+        """
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        # key -> (源文件路径, 源文件状态, 估算大小, 结果)
+        self._entries: "OrderedDict[str, Tuple[Tuple[str, ...], Tuple, int, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def stat(sources: List[Path]) -> Tuple:
+        """源文件的状态，读取之前获取并传给 set，读取过程中文件变化时缓存的结果会在下次 get 时失效"""
+        stats = []
+        for source in sources:
+            stat = source.stat()
+            stats.append((stat.st_size, stat.st_mtime_ns, stat.st_ino))
+        return tuple(stats)
+
+    @staticmethod
+    def make_key(sources: List[Path], options: Dict[str, Any]) -> str:
+        return _sha(repr(([str(source.resolve()) for source in sources], sorted(options.items()))))
+
+    def get(self, key: str, sources: List[Path], stats: Optional[Tuple] = None) -> Any:
+        """读取缓存，不存在或源文件已变化时返回 None"""
+        if stats is None:
+            try:
+                stats = self.stat(sources)
+            except FileNotFoundError:
+                stats = None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] != stats:
+                self._pop(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[3]
+
+    def set(self, key: str, sources: List[Path], value: Any, stats: Optional[Tuple] = None) -> None:
+        """
+        Args:
+            stats (tuple): 读取之前通过 stat() 获取的源文件状态，为 None 时现在获取
+        """
+        if stats is None:
+            stats = self.stat(sources)
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return
+        paths = tuple(str(source.resolve()) for source in sources)
+        with self._lock:
+            if key in self._entries:
+                self._pop(key)
+            self._entries[key] = (paths, stats, size, value)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                self._pop(next(iter(self._entries)))
+
+    def _pop(self, key: str) -> None:
+        entry = self._entries.pop(key)
+        self.current_bytes -= entry[2]
+
+    def invalidate(self, file_name: Union[str, Path, None] = None) -> int:
+        """
+        删除缓存，file_name 为 None 时清空所有缓存
+
+        Returns:
+            int: 删除的缓存个数
+        """
+        path = None if file_name is None else str(Path(file_name).resolve())
+        with self._lock:
+            keys = [key for key, entry in self._entries.items() if path is None or path in entry[0]]
+            for key in keys:
+                self._pop(key)
+        return len(keys)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# read_file(memo=True) 使用的全局缓存
+default_memory_cache = MemoryCache()
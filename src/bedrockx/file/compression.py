@@ -0,0 +1,91 @@
+# -*- encoding: utf-8 -*-
+# @Time    :   2026/10/17 14:26:31
+# @File    :   compression.py
+# @Author  :   ciaoyizhen
+# @Contact :   yizhen.ciao@gmail.com
+# @Function:   根据后缀透明地读写压缩文件(gz/bz2/xz/zst)
+import io
+import bz2
+import gzip
+import lzma
+from pathlib import Path
+from typing import IO, Optional, Tuple
+
+_COMPRESSION_SUFFIXES = {
+    ".gz": "gzip",
+    ".gzip": "gzip",
+    ".bz2": "bz2",
+    ".xz": "xz",
+    ".zst": "zstd",
+    ".zstd": "zstd",
+}
+
+
+def split_compression(file_name: Path) -> Tuple[str, Optional[str]]:
+    """
+    从后缀链中解析文件格式和压缩格式
+    example:
+    >>> split_compression(Path("data.jsonl.gz"))
+    >>> ("jsonl", "gzip")
+
+    Returns:
+        Tuple[str, Optional[str]]: (文件格式, 压缩格式)，未压缩时压缩格式为 None
+    """
+    suffixes = [suffix.lower() for suffix in file_name.suffixes]
+    compression = None
+    if suffixes and suffixes[-1] in _COMPRESSION_SUFFIXES:
+        compression = _COMPRESSION_SUFFIXES[suffixes.pop()]
+    file_type = suffixes[-1].lstrip(".") if suffixes else ""
+    return file_type, compression
+
+
+def _open_binary(file_name: Path, mode: str, compression: str, threads: int) -> IO[bytes]:
+    match compression:
+        case "gzip":
+            # 安装了 python-isal 时使用多线程(解)压缩，否则使用标准库
+            if threads > 1:
+                try:
+                    from isal import igzip_threaded
+                    return igzip_threaded.open(file_name, mode, threads=threads)
+                except ImportError:
+                    pass
+            return gzip.open(file_name, mode)
+        case "bz2":
+            return bz2.open(file_name, mode)
+        case "xz":
+            return lzma.open(file_name, mode)
+        case "zstd":
+            try:
+                import zstandard
+            except ImportError as e:
+                raise RuntimeError("读写 .zst 文件需要安装 zstandard: pip install zstandard") from e
+            cctx = zstandard.ZstdCompressor(threads=threads if threads > 1 else 0) if "r" not in mode else None
+            return zstandard.open(file_name, mode, cctx=cctx)
+        case _:
+            raise RuntimeError(f"不支持的压缩格式: {compression}")
+
+
+def open_file(file_name: Path, mode: str = "r", *, encoding: str = "utf-8", compression: Optional[str] = None, threads: int = 0, buffering: int = -1, newline: Optional[str] = None) -> IO:
+    """
+    打开普通文件或压缩文件，读写均为流式
+    mode 与内置 open 一致，支持 r/w/a 以及对应的二进制模式
+
+    Args:
+        file_name (Path): 文件路径
+        mode (str): 打开模式
+        encoding (str): 文本模式下的编码
+        compression (str): `gzip`, `bz2`, `xz`, `zstd`，为 None 时按普通文件打开
+        threads (int): 压缩/解压使用的线程数，gzip 需要 python-isal，zstd 需要 zstandard（多线程仅用于压缩）
+        buffering (int): 普通文件的缓冲区大小，与内置 open 一致，压缩文件由压缩库自行缓冲
+        newline (str): 文本模式下的换行符处理，与内置 open 一致
+    """
+    if compression is None:
+        if "b" in mode:
+            return file_name.open(mode, buffering=buffering)
+        return file_name.open(mode, buffering=buffering, encoding=encoding, newline=newline)
+
+    binary_mode = mode if "b" in mode else mode + "b"
+    f = _open_binary(file_name, binary_mode, compression, threads)
+    if "b" in mode:
+        return f
+    return io.TextIOWrapper(f, encoding=encoding, newline=newline)
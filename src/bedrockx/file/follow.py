@@ -0,0 +1,182 @@
+# -*- encoding: utf-8 -*-
+# @Time    :   2026/10/17 18:05:12
+# @File    :   follow.py
+# @Author  :   ciaoyizhen
+# @Contact :   yizhen.ciao@gmail.com
+# @Function:   跟随读取 jsonl 中新追加的数据(类似 tail -f)
+import os
+import time
+from pathlib import Path
+from typing import Any, Callable, Iterator, List, Optional, Union
+from ..utils.log_manage import base_logger
+from ..utils.json_codec import get_json_codec
+
+
+class JsonlFollower:
+    """
+    增量读取 jsonl 新追加的完整行，记录已读取的字节偏移，每次只读取新增部分
+    - 末尾没有换行符的不完整行留到下次读取
+    - 文件被截断（大小小于偏移）时从头读取
+    - 文件被轮转（路径对应的 inode 变化）时先读完旧文件剩余的数据，再从新文件开头读取
+    - 每次 read_new 最多读取约 block_size 字节，积压很多数据时分多次读取，内存占用与积压的数据量无关
+
+    用法：
+        follower = JsonlFollower("output.jsonl")
+        while True:
+            items = follower.read_new()
+            ...
+            if not items:
+                time.sleep(1)
+    """
+
+    def __init__(
+        self,
+        file_name: Union[str, Path],
+        *,
+        encoding: str = "utf-8",
+        offset: int = 0,
+        from_end: bool = False,
+        block_size: int = 4 * 1024 ** 2,
+    ):
+        """
+        Args:
+            file_name (str|Path): jsonl 文件路径，可以暂时不存在
+            encoding (str): 文件编码方式
+            offset (int): 起始字节偏移，可用于从上次保存的 follower.offset 继续读取
+            from_end (bool): 是否跳过已有数据，只读取之后追加的数据
+            block_size (int): 每次 read_new 读取的字节数上限，单行超过该大小时读取到该行结束为止
+        """
+        self.file_name = Path(file_name)
+        self.encoding = encoding
+        self.offset = offset
+        self._from_end = from_end
+        self.block_size = block_size
+        self._file = None
+        self._loads = get_json_codec().loads
+
+    def _open(self) -> bool:
+        try:
+            self._file = self.file_name.open("rb")
+        except FileNotFoundError:
+            return False
+        if self._from_end:
+            self.offset = os.fstat(self._file.fileno()).st_size
+            self._from_end = False
+        return True
+
+    def _rotated(self) -> bool:
+        try:
+            return os.stat(self.file_name).st_ino != os.fstat(self._file.fileno()).st_ino
+        except FileNotFoundError:
+            # 轮转过程中新文件还没有创建，继续读取旧文件
+            return False
+
+    def _read_lines(self, final: bool = False) -> List[Any]:
+        """
+        从 offset 读取最多 block_size 字节，只解析其中完整的行；
+        final 为 True 且读到文件末尾时，最后一个不完整的行也会被解析
+        """
+        if os.fstat(self._file.fileno()).st_size < self.offset:
+            base_logger.warning(f"{self.file_name} 被截断，从头开始读取")
+            self.offset = 0
+        self._file.seek(self.offset)
+        data = bytearray(self._file.read(self.block_size))
+        end = data.rfind(b"\n") + 1
+        # 单行超过 block_size 时继续读取，直到读到换行符或文件末尾
+        while end == 0:
+            more = self._file.read(self.block_size)
+            if not more:
+                break
+            pos = more.find(b"\n")
+            if pos != -1:
+                end = len(data) + pos + 1
+            data += more
+        if end == 0 and final:
+            end = len(data)
+        if end == 0:
+            return []
+        self.offset += end
+
+        result = []
+        for line in bytes(data[:end]).split(b"\n"):
+            if not line.strip():
+                continue
+            try:
+                result.append(self._loads(line.decode(self.encoding)))
+            except ValueError:
+                base_logger.warning(f"{self.file_name} 中存在无法解析的行，已跳过: {line[:200]!r}")
+        return result
+
+    def read_new(self) -> List[Any]:
+        """读取上次调用之后追加的完整行，单次最多读取约 block_size 字节，积压的数据需要多次调用"""
+        if self._file is None and not self._open():
+            return []
+        if not self._rotated():
+            return self._read_lines()
+        # 旧文件不会再被写入，分块读完剩余的数据后再切换到新文件
+        result = self._read_lines(final=True)
+        if self.offset < os.fstat(self._file.fileno()).st_size:
+            return result
+        self._file.close()
+        self.offset = 0
+        if not self._open():
+            self._file = None
+            return result
+        result.extend(self._read_lines())
+        return result
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> "JsonlFollower":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def follow_file(
+    file_name: Union[str, Path],
+    *,
+    encoding: str = "utf-8",
+    poll_interval: float = 1.0,
+    timeout: Optional[float] = None,
+    from_end: bool = False,
+    process_fn: Optional[Callable[[Any], Any]] = None,
+    block_size: int = 4 * 1024 ** 2,
+) -> Iterator[Any]:
+    """
+    跟随读取 jsonl 新追加的数据，逐条 yield，类似 tail -f
+    积压的数据按 block_size 分块读取与解析，从头跟随很大的文件时内存占用同样有上限
+    适合下游消费 BaseMultiThreading/return_to_jsonl 正在写入的文件，每次轮询只读取新增部分
+
+    Args:
+        file_name (str|Path): jsonl 文件路径
+        encoding (str): 文件编码方式
+        poll_interval (float): 没有新数据时的轮询间隔（秒）
+        timeout (float): 连续多少秒没有新数据后结束，None 表示一直跟随
+        from_end (bool): 是否跳过已有数据，只读取之后追加的数据
+        process_fn (Callable): 对每条数据做处理，返回 None 的数据会被跳过
+        block_size (int): 每次读取的字节数上限，见 JsonlFollower
+
+    Yields:
+        Any: 新追加的单条数据
+    """
+    with JsonlFollower(file_name, encoding=encoding, from_end=from_end, block_size=block_size) as follower:
+        last_data_time = time.monotonic()
+        while True:
+            items = follower.read_new()
+            if items:
+                last_data_time = time.monotonic()
+                for item in items:
+                    if process_fn:
+                        item = process_fn(item)
+                        if item is None:
+                            continue
+                    yield item
+                continue
+            if timeout is not None and time.monotonic() - last_data_time >= timeout:
+                return
+            time.sleep(poll_interval)
@@ -0,0 +1,201 @@
+# -*- encoding: utf-8 -*-
+# @Time    :   2026/10/17 11:03:47
+# @File    :   jsonl_index.py
+# @Author  :   ciaoyizhen
+# @Contact :   yizhen.ciao@gmail.com
+# @Function:   jsonl 行偏移索引，支持随机访问与切片
+import os
+import mmap
+import random
+import struct
+from array import array
+from pathlib import Path
+from typing import Any, Iterator, List, Optional, Union
+from ..utils.json_codec import get_json_codec
+from ..utils.log_manage import base_logger
+
+# 索引文件头: magic, 源文件大小, 源文件 mtime_ns, 行数
+_HEADER = struct.Struct("<8sQQQ")
+_MAGIC = b"BRXJIDX1"
+_WHITESPACE = b" \t\r"
+
+
+class JsonlIndex:
+    """
+    jsonl 行偏移索引，索引保存在 `<file>.idx`，源文件的大小或 mtime 变化后自动重建
+    只记录非空行的起始偏移，通过 mmap 按需解析，不需要重新扫描文件
+
+    用法：
+        index = JsonlIndex("data.jsonl")
+        len(index)          # 行数
+        index[10]           # 第 11 条数据
+        index[100:200]      # 切片
+        index.sample(5)     # 随机采样
+    """
+
+    def __init__(self, file_name: Union[str, Path], *, encoding: str = "utf-8", index_path: Union[str, Path, None] = None, rebuild: bool = False):
+        """
+        Args:
+            file_name (str|Path): jsonl 文件路径
+            encoding (str): 文件编码方式
+            index_path (str|Path): 索引文件路径，默认为 `<file>.idx`
+            rebuild (bool): 是否强制重建索引
+        """
+        self.file_name = Path(file_name)
+        self.encoding = encoding
+        self.index_path = Path(index_path) if index_path else self.default_index_path(self.file_name)
+
+        self.offsets = None if rebuild else self._load(self.file_name, self.index_path)
+        if self.offsets is None:
+            # 在扫描之前获取文件状态，扫描过程中文件被追加时索引不会被当作最新
+            stat = self.file_name.stat()
+            self.offsets = self._build()
+            self._save(stat)
+
+        self._file = None
+        self._mmap = None
+
+    @staticmethod
+    def default_index_path(file_name: Path) -> Path:
+        return file_name.with_name(file_name.name + ".idx")
+
+    @classmethod
+    def load_if_fresh(cls, file_name: Union[str, Path], *, encoding: str = "utf-8") -> Optional["JsonlIndex"]:
+        """存在且未过期的索引才加载，否则返回 None，不会触发扫描"""
+        file_name = Path(file_name)
+        offsets = cls._load(file_name, cls.default_index_path(file_name))
+        if offsets is None:
+            return None
+        index = cls.__new__(cls)
+        index.file_name = file_name
+        index.encoding = encoding
+        index.index_path = cls.default_index_path(file_name)
+        index.offsets = offsets
+        index._file = None
+        index._mmap = None
+        return index
+
+    @classmethod
+    def fresh_count(cls, file_name: Union[str, Path]) -> Optional[int]:
+        """存在且未过期的索引只读取文件头返回行数，否则返回 None，不会读取偏移数组或触发扫描"""
+        file_name = Path(file_name)
+        index_path = cls.default_index_path(file_name)
+        if not index_path.exists():
+            return None
+        with index_path.open("rb") as f:
+            return cls._read_header(f, file_name)
+
+    @staticmethod
+    def _read_header(f, file_name: Path) -> Optional[int]:
+        """校验索引文件头与源文件状态、索引文件大小，返回行数"""
+        header = f.read(_HEADER.size)
+        if len(header) != _HEADER.size:
+            return None
+        magic, size, mtime_ns, count = _HEADER.unpack(header)
+        stat = file_name.stat()
+        if magic != _MAGIC or size != stat.st_size or mtime_ns != stat.st_mtime_ns:
+            return None
+        if os.fstat(f.fileno()).st_size != _HEADER.size + 8 * count:
+            return None
+        return count
+
+    @classmethod
+    def _load(cls, file_name: Path, index_path: Path) -> Optional[array]:
+        if not index_path.exists():
+            return None
+        with index_path.open("rb") as f:
+            if cls._read_header(f, file_name) is None:
+                return None
+            offsets = array("Q")
+            offsets.frombytes(f.read())
+        return offsets
+
+    def _build(self) -> array:
+        """按 1MB 分块扫描换行符，记录每个非空行的起始偏移"""
+        offsets = array("Q")
+        buf_size = 1024 * 1024
+        with self.file_name.open("rb") as f:
+            pos = 0
+            line_start = 0
+            has_content = False
+            while buffer := f.read(buf_size):
+                start = 0
+                while True:
+                    end = buffer.find(b"\n", start)
+                    if not has_content:
+                        # 绝大多数行首字符即非空白，避免每行都切片
+                        stop = len(buffer) if end == -1 else end
+                        has_content = start < stop and (buffer[start] not in _WHITESPACE or bool(buffer[start:stop].strip()))
+                    if end == -1:
+                        break
+                    if has_content:
+                        offsets.append(line_start)
+                    line_start = pos + end + 1
+                    has_content = False
+                    start = end + 1
+                pos += len(buffer)
+            # 最后一行没有换行符
+            if has_content:
+                offsets.append(line_start)
+        return offsets
+
+    def _save(self, stat: os.stat_result) -> None:
+        """先写入临时文件再替换，避免其他进程读到写了一半的索引；目录不可写时只保留内存中的索引"""
+        tmp_path = self.index_path.with_name(self.index_path.name + f".{os.getpid()}.tmp")
+        try:
+            with tmp_path.open("wb") as f:
+                f.write(_HEADER.pack(_MAGIC, stat.st_size, stat.st_mtime_ns, len(self.offsets)))
+                self.offsets.tofile(f)
+            os.replace(tmp_path, self.index_path)
+        except OSError as e:
+            base_logger.warning(f"无法写入索引文件 {self.index_path}，本次只在内存中使用索引: {e!r}")
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+    def _get_mmap(self) -> mmap.mmap:
+        if self._mmap is None:
+            self._file = self.file_name.open("rb")
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mmap
+
+    def read_line(self, i: int) -> bytes:
+        """返回第 i 行的原始字节（不含换行符）"""
+        mm = self._get_mmap()
+        start = self.offsets[i]
+        end = mm.find(b"\n", start)
+        return mm[start:] if end == -1 else mm[start:end]
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def __getitem__(self, key: Union[int, slice]) -> Any:
+        loads = get_json_codec().loads
+        if isinstance(key, slice):
+            return [loads(self.read_line(i).decode(self.encoding)) for i in range(*key.indices(len(self)))]
+        if key < 0:
+            key += len(self)
+        if not 0 <= key < len(self):
+            raise IndexError(f"索引越界: {key}，共 {len(self)} 行")
+        return loads(self.read_line(key).decode(self.encoding))
+
+    def __iter__(self) -> Iterator[Any]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def sample(self, k: int, *, seed: Optional[int] = None) -> List[Any]:
+        """不放回随机采样 k 条数据"""
+        rng = random.Random(seed)
+        return [self[i] for i in rng.sample(range(len(self)), k)]
+
+    def close(self) -> None:
+        if self._mmap is not None:
+            self._mmap.close()
+            self._file.close()
+            self._mmap = None
+            self._file = None
+
+    def __enter__(self) -> "JsonlIndex":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
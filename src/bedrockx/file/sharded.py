@@ -0,0 +1,214 @@
+# -*- encoding: utf-8 -*-
+# @Time    :   2026/10/17 16:02:18
+# @File    :   sharded.py
+# @Author  :   ciaoyizhen
+# @Contact :   yizhen.ciao@gmail.com
+# @Function:   按行数/字节数滚动的分片 jsonl 写入，附带记录分片信息的 manifest
+import os
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Union
+from .compression import split_compression, open_file
+from ..utils.json_codec import get_json_codec
+
+_MANIFEST_SUFFIX = "manifest"
+
+
+def _with_suffix(file_name: Path, suffix: str, extension: Optional[str] = None) -> Path:
+    """
+    在格式后缀前插入后缀，压缩后缀保留在最后
+    data.jsonl.gz + part-00000 -> data_part-00000.jsonl.gz
+    """
+    # 延迟导入，避免与 utils 循环引用
+    from .utils import add_suffix_file
+
+    compression_suffix = ""
+    if split_compression(file_name)[1] is not None:
+        compression_suffix = file_name.suffix
+        file_name = file_name.with_suffix("")
+    new_name = add_suffix_file(file_name.name, suffix)
+    if extension is not None:
+        return file_name.parent / new_name.with_suffix(extension)
+    return file_name.parent / f"{new_name}{compression_suffix}"
+
+
+def manifest_path(file_name: Union[str, Path]) -> Path:
+    """分片写入时 manifest 的路径，如 data.jsonl -> data_manifest.json"""
+    return _with_suffix(Path(file_name), _MANIFEST_SUFFIX, ".json")
+
+
+def is_manifest(file_name: Path) -> bool:
+    """
+    文件名以 `_manifest.json` 结尾且内容是 ShardedWriter 写入的 manifest（含 format 与 shards 的 dict）
+    同名的普通 json 文件（如根为数组的 model_manifest.json）不会被当作 manifest
+    """
+    if not file_name.name.endswith(f"_{_MANIFEST_SUFFIX}.json") or not file_name.is_file():
+        return False
+    try:
+        with file_name.open("r", encoding="utf-8") as f:
+            # 根不是对象时不需要解析整个文件
+            head = f.read(64).lstrip()
+            if not head.startswith("{"):
+                return False
+            f.seek(0)
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return isinstance(manifest, dict) and "format" in manifest and isinstance(manifest.get("shards"), list)
+
+
+def read_manifest(file_name: Union[str, Path]) -> List[Path]:
+    """读取 manifest，返回按顺序排列的分片路径"""
+    file_name = Path(file_name)
+    with file_name.open("r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    return [file_name.parent / shard["file"] for shard in manifest["shards"]]
+
+
+class ShardedWriter:
+    """
+    分片 jsonl 写入器，超过 shard_rows 行或 shard_bytes 字节后滚动到下一个分片
+    data.jsonl -> data_part-00000.jsonl, data_part-00001.jsonl, ... 以及 data_manifest.json
+
+    manifest 记录每个分片的文件名、行数与字节数（未压缩），在打开新分片和关闭时更新，
+    read_file 传入 manifest 路径或分片所在目录即可并发读取所有分片
+
+    用法：
+        with ShardedWriter("output/data.jsonl", shard_rows=100000) as writer:
+            for item in data:
+                writer.write(item)
+    """
+
+    def __init__(
+        self,
+        file_name: Union[str, Path],
+        *,
+        shard_rows: Optional[int] = None,
+        shard_bytes: Optional[int] = None,
+        encoding: str = "utf-8",
+        ensure_ascii: bool = False,
+        resume: bool = False,
+        compression_threads: int = 0,
+    ):
+        """
+        Args:
+            file_name (str|Path): 输出文件名，分片名在其基础上添加 `_part-00000` 后缀
+            shard_rows (int): 每个分片的最大行数
+            shard_bytes (int): 每个分片的最大字节数（未压缩），单行超过该大小时单独成为一个分片
+            encoding (str): 文件编码方式
+            ensure_ascii (bool): 是否转义非 ASCII 字符
+            resume (bool): 是否根据已有的 manifest 接着写入，最后一个分片未写满时继续追加
+            compression_threads (int): 分片为压缩文件时的压缩线程数
+        """
+        if shard_rows is None and shard_bytes is None:
+            raise RuntimeError("分片写入时必须指定 shard_rows 或 shard_bytes")
+        self.file_name = Path(file_name)
+        file_type, self.compression = split_compression(self.file_name)
+        if file_type != "jsonl":
+            raise RuntimeError(f"分片写入目前仅支持 jsonl，收到的文件格式是: {file_type}")
+
+        self.shard_rows = shard_rows
+        self.shard_bytes = shard_bytes
+        self.encoding = encoding
+        self.ensure_ascii = ensure_ascii
+        self.compression_threads = compression_threads
+        self.manifest_path = manifest_path(self.file_name)
+        self.shards: List[Dict[str, Any]] = []
+        self._file = None
+        self._dumps = get_json_codec().dumps
+
+        self.file_name.parent.mkdir(exist_ok=True, parents=True)
+        if resume and self.manifest_path.exists():
+            self._resume()
+
+    def shard_path(self, index: int) -> Path:
+        return _with_suffix(self.file_name, f"part-{index:05d}")
+
+    @property
+    def total_rows(self) -> int:
+        return sum(shard["rows"] for shard in self.shards)
+
+    def _resume(self) -> None:
+        with self.manifest_path.open("r", encoding="utf-8") as f:
+            self.shards = json.load(f)["shards"]
+        if not self.shards:
+            return
+        # manifest 只在打开/关闭分片时更新，最后一个分片以磁盘上的实际内容为准
+        last = self.shards[-1]
+        path = self.manifest_path.parent / last["file"]
+        last["rows"], last["bytes"] = 0, 0
+        if path.exists():
+            with open_file(path, "rb", compression=self.compression) as f:
+                for line in f:
+                    if line.strip():
+                        last["rows"] += 1
+                    last["bytes"] += len(line)
+        if not self._is_full(last, 0):
+            self._file = open_file(path, "ab", compression=self.compression, threads=self.compression_threads)
+
+    def _is_full(self, shard: Dict[str, Any], next_bytes: int) -> bool:
+        if shard["rows"] == 0:
+            return False
+        if self.shard_rows is not None and shard["rows"] >= self.shard_rows:
+            return True
+        return self.shard_bytes is not None and shard["bytes"] + next_bytes > self.shard_bytes
+
+    def _roll_over(self) -> None:
+        if self._file is not None:
+            self._file.close()
+        path = self.shard_path(len(self.shards))
+        self.shards.append({"file": path.name, "rows": 0, "bytes": 0})
+        self._file = open_file(path, "wb", compression=self.compression, threads=self.compression_threads)
+        self._write_manifest()
+
+    def _write_manifest(self) -> None:
+        manifest = {
+            "format": "jsonl",
+            "shard_rows": self.shard_rows,
+            "shard_bytes": self.shard_bytes,
+            "total_rows": self.total_rows,
+            "shards": self.shards,
+        }
+        # 先写临时文件再替换，中断时不会留下不完整的 manifest
+        tmp_path = self.manifest_path.with_name(self.manifest_path.name + ".tmp")
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=4)
+        os.replace(tmp_path, self.manifest_path)
+
+    def write_line(self, line: str) -> None:
+        """写入一行已经序列化好的 json（不含换行符）"""
+        data = (line + "\n").encode(self.encoding)
+        if self._file is None or self._is_full(self.shards[-1], len(data)):
+            self._roll_over()
+        self._file.write(data)
+        shard = self.shards[-1]
+        shard["rows"] += 1
+        shard["bytes"] += len(data)
+
+    def write(self, item: Any) -> None:
+        """序列化并写入一条数据"""
+        self.write_line(self._dumps(item, self.ensure_ascii))
+
+    def write_many(self, items: Iterable[Any]) -> None:
+        for item in items:
+            self.write(item)
+
+    def flush(self) -> None:
+        if self._file is not None:
+            self._file.flush()
+
+    def fileno(self) -> int:
+        """当前分片的文件描述符，用于 os.fsync"""
+        return self._file.fileno()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._write_manifest()
+
+    def __enter__(self) -> "ShardedWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
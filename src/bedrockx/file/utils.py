@@ -5,14 +5,24 @@
 # @Contact :   yizhen.ciao@gmail.com
 # @Function:   读取文件和保存文件
 import json
+import glob
+import numbers
 import inspect
 import ijson
+import openpyxl
 from itertools import islice
+from collections import deque, defaultdict
 from pathlib import Path
-from typing import List, Dict, Literal, Union, Optional, Set, Callable, Any, overload
+from typing import List, Dict, Literal, Union, Optional, Set, Callable, Any, Iterable, Iterator, Container, overload
 from tqdm import tqdm
 from functools import wraps
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from ..utils.log_manage import base_logger
+from .jsonl_index import JsonlIndex
+from .compression import split_compression, open_file
+from .sharded import ShardedWriter, is_manifest, read_manifest
+from .cache import DiskCache, MemoryCache, callable_identity, default_memory_cache
+from ..utils.json_codec import get_json_codec, get_json_backend, set_json_backend, json_dumps
 import pandas as pd
 
 class ReadFileExampleCallBack:
@@ -69,8 +79,11 @@ class ReadFileExampleCallBack:
 def _get_line_count(file_path: Path) -> int:
     """
     快速计算文件行数（不加载到内存）
-    对于大文件，这比直接遍历快得多
+    对于大文件，这比直接遍历快得多；存在未过期的 JsonlIndex 索引时直接返回索引行数
     """
+    count = JsonlIndex.fresh_count(file_path)
+    if count is not None:
+        return count
     lines = 0
     with file_path.open("rb") as f:
         # 使用 1MB 的 buffer 逐块读取来计数换行符
@@ -82,10 +95,379 @@ def _get_line_count(file_path: Path) -> int:
             buffer = read_f(buf_size)
     return lines
 
+def _split_jsonl_ranges(file_name: Path, num_chunks: int) -> List[tuple]:
+    """
+    将文件按字节切分为 num_chunks 段左右，每段边界对齐到行首
+    返回 [(start, end), ...]，各段首尾相接覆盖整个文件
+    """
+    size = file_name.stat().st_size
+    if size == 0:
+        return []
+    step = max(size // max(num_chunks, 1), 1)
+    bounds = [0]
+    with file_name.open("rb") as f:
+        pos = step
+        while pos < size:
+            # 从 pos-1 开始读到行尾，保证 pos 恰好是行首时不会跳过整行
+            f.seek(pos - 1)
+            f.readline()
+            pos = f.tell()
+            if pos >= size:
+                break
+            bounds.append(pos)
+            pos += step
+    bounds.append(size)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+def _project(item: Any, columns: Optional[List[str]]) -> Any:
+    """只保留 columns 中的字段，非 dict 数据原样返回"""
+    if columns is None or not isinstance(item, dict):
+        return item
+    return {key: item[key] for key in columns if key in item}
+
+_MISSING = object()
+
+def _filter_read_columns(columns: Optional[List[str]], where: Optional[Callable[[Any], bool]], exclude_keys: Optional[Container], key_column: Optional[str], dedup_on: Optional[str]) -> Optional[List[str]]:
+    """
+    过滤在投影之前执行，返回实际需要读取的列：
+    where 可能用到任意字段，此时不下推 columns；exclude_keys/dedup_on 用到的字段追加到读取的列中，过滤后再投影
+    """
+    if columns is None or where is not None:
+        return None
+    extra = [key for key in (key_column if exclude_keys is not None else None, dedup_on) if key is not None and key not in columns]
+    return columns + extra if extra else columns
+
+def _keep_row(item: Any, where: Optional[Callable[[Any], bool]], exclude_keys: Optional[Container], key_column: Optional[str]) -> bool:
+    """where/exclude_keys 过滤，返回 False 的数据直接丢弃，不会被存储"""
+    if where is not None and not where(item):
+        return False
+    if exclude_keys is not None:
+        if not isinstance(item, dict) or key_column not in item:
+            raise RuntimeError(f"数据缺少 main_key_column='{key_column}'\n数据内容: {item}")
+        return item[key_column] not in exclude_keys
+    return True
+
+def _dedup_key(item: Any, dedup_on: str) -> Any:
+    """提取去重的键，缺失时与 drop_duplicates 一致，打印警告并返回 _MISSING"""
+    if isinstance(item, dict) and dedup_on in item:
+        return item[dedup_on]
+    base_logger.warning(f"不存在对应的key:{dedup_on=}\n{item=}\n已跳过")
+    return _MISSING
+
+def _parse_jsonl_range(
+    file_name: Path,
+    start: int,
+    end: int,
+    encoding: str,
+    process_fn: Optional[Callable[[Any], Any]],
+    json_backend: str,
+    columns: Optional[List[str]] = None,
+    where: Optional[Callable[[Any], bool]] = None,
+    exclude_keys: Optional[Container] = None,
+    key_column: Optional[str] = None,
+    dedup_on: Optional[str] = None,
+) -> List:
+    """
+    子进程中执行：解析 [start, end) 字节范围内的所有行，执行过滤与 process_fn
+    指定 dedup_on 时返回 [(去重键, 数据), ...]，由主进程做全局去重
+    """
+    loads = get_json_codec(json_backend).loads
+    read_columns = _filter_read_columns(columns, where, exclude_keys, key_column, dedup_on)
+    seen_keys = set()
+    result = []
+    with file_name.open("rb") as f:
+        f.seek(start)
+        pos = start
+        while pos < end:
+            line = f.readline()
+            if not line:
+                break
+            pos += len(line)
+            if line := line.strip():
+                item = _project(loads(line.decode(encoding)), read_columns)
+                if not _keep_row(item, where, exclude_keys, key_column):
+                    continue
+                if dedup_on is not None:
+                    # 段内先去重，减少回传主进程的数据量
+                    key = _dedup_key(item, dedup_on)
+                    if key is _MISSING or key in seen_keys:
+                        continue
+                    seen_keys.add(key)
+                if read_columns is not columns:
+                    item = _project(item, columns)
+                if process_fn:
+                    item = process_fn(item)
+                    if item is None:
+                        continue
+                result.append((key, item) if dedup_on is not None else item)
+    return result
+
+def _iter_jsonl(file_name: Path, encoding: str, data_length: Optional[int], columns: Optional[List[str]] = None, compression: Optional[str] = None, threads: int = 0) -> Iterator[Any]:
+    """逐行解析 jsonl，读够 data_length 行即停，空行跳过"""
+    loads = get_json_codec().loads
+    with open_file(file_name, "r", encoding=encoding, compression=compression, threads=threads) as f:
+        for line in islice(f, data_length):
+            if line := line.strip():
+                yield _project(loads(line), columns)
+
+def _iter_json(file_name: Path, data_length: Optional[int], columns: Optional[List[str]] = None, compression: Optional[str] = None, threads: int = 0) -> Iterator[Any]:
+    """使用 ijson 流式解析根级数组中的每个元素"""
+    with open_file(file_name, "rb", compression=compression, threads=threads) as f:
+        # 'item' 指示 ijson 解析根级数组中的每个元素，这要求 JSON 文件的根必须是列表 [ ... ]
+        iterator = ijson.items(f, 'item')
+        if columns is not None:
+            # ijson.items 由 C 后端构建对象，比在 Python 中逐个处理 parse 事件只构建部分字段更快
+            iterator = (_project(item, columns) for item in iterator)
+        if data_length:
+            iterator = islice(iterator, data_length)
+        try:
+            yield from iterator
+        except ijson.common.IncompleteJSONError as e:
+            raise RuntimeError("JSON 文件格式错误或不完整") from e
+
+def _iter_csv(file_name: Path, encoding: str, data_length: Optional[int], na_filter: bool, chunk_size: int, columns: Optional[List[str]] = None, **kwargs) -> Iterator[Dict]:
+    """
+    按 chunk_size 分块读取 csv，每次只在内存中保留一个块
+    pandas 对每个块单独推断类型，未指定 dtype 时先读取第一块，用其推断出的类型解析整个文件，
+    保证同一列在不同块中类型一致；后续数据无法按该类型解析时报错，需要显式指定 dtype
+    """
+    if columns is not None:
+        kwargs["usecols"] = columns
+    if "dtype" not in kwargs:
+        first_rows = chunk_size if data_length is None else min(chunk_size, data_length)
+        first = pd.read_csv(file_name, encoding=encoding, nrows=first_rows, na_filter=na_filter, **kwargs)
+        if len(first) < first_rows or first_rows == data_length:
+            yield from first.to_dict(orient="records")
+            return
+        # 日期等类型不能通过 dtype 指定，交给 parse_dates 等参数处理
+        kwargs["dtype"] = {column: dtype for column, dtype in first.dtypes.items() if dtype.kind in "biufO"}
+    with pd.read_csv(file_name, encoding=encoding, nrows=data_length, na_filter=na_filter, chunksize=chunk_size, **kwargs) as reader:
+        try:
+            for chunk in reader:
+                yield from chunk.to_dict(orient="records")
+        except (ValueError, TypeError) as e:
+            raise RuntimeError(f"{file_name} 的数据无法按前 {chunk_size} 行推断的列类型解析，请通过 dtype 参数指定列类型或增大 chunk_size: {e}") from e
+
+def _dedup_header(header: List) -> List:
+    """
+    与 pd.read_excel 一致地生成列名：空表头为 `Unnamed: i`，重复的列名依次改为 a.1、a.2，跳过表头中已有的名字；
+    先处理有名字的列，再处理 Unnamed 列
+    """
+    names = [f"Unnamed: {i}" if col is None else col for i, col in enumerate(header)]
+    unnamed = [i for i, col in enumerate(header) if col is None]
+    counts = defaultdict(int)
+    for i in [i for i, col in enumerate(header) if col is not None] + unnamed:
+        col = old_col = names[i]
+        count = counts[col]
+        while count > 0:
+            counts[old_col] = count + 1
+            col = f"{old_col}.{count}"
+            count = count + 1 if col in names else counts[col]
+        names[i] = col
+        counts[col] = count + 1
+    return names
+
+def _iter_xlsx(file_name: Path, data_length: Optional[int], na_filter: bool, sheet_name: Union[str, int, List, None] = 0, columns: Optional[List[str]] = None) -> Iterator[Dict]:
+    """
+    使用 openpyxl 只读模式逐行读取 xlsx，不构建整个工作簿的 DataFrame
+    sheet_name 与 pandas 保持一致：int 为下标，str 为 sheet 名，"all"/None 为所有 sheet
+    """
+    empty_value = float("nan") if na_filter else ""
+    workbook = openpyxl.load_workbook(file_name, read_only=True, data_only=True)
+    try:
+        if sheet_name == "all" or sheet_name is None:
+            sheets = workbook.worksheets
+        else:
+            names = sheet_name if isinstance(sheet_name, list) else [sheet_name]
+            sheets = [workbook.worksheets[name] if isinstance(name, int) else workbook[name] for name in names]
+
+        count = 0
+        for sheet in sheets:
+            rows = sheet.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                continue
+            header = _dedup_header(header)
+            # 只保留 columns 中的列（按下标取值，跳过其余单元格）
+            keep = [(i, col) for i, col in enumerate(header) if columns is None or col in columns]
+            # 与 pandas 一致，中间的空行保留，末尾的空行丢弃，因此空行先计数，遇到非空行再输出
+            pending_empty = 0
+            for row in rows:
+                if all(value is None for value in row):
+                    pending_empty += 1
+                    continue
+                for values in [()] * pending_empty + [row]:
+                    if data_length is not None and count >= data_length:
+                        return
+                    yield {col: empty_value if i >= len(values) or values[i] is None else values[i] for i, col in keep}
+                    count += 1
+                pending_empty = 0
+    finally:
+        workbook.close()
+
+_COLUMNAR_OUTPUT = ("columns", "dataframe", "arrow")
+_ARROW_TYPES = ("parquet", "arrow", "feather")
+_READABLE_TYPES = ("jsonl", "json", "csv", "xlsx", "xls") + _ARROW_TYPES
+# 自带压缩或需要随机访问的格式，不支持外层 .gz 等压缩后缀
+_NO_COMPRESSION_TYPES = ("xlsx", "xls") + _ARROW_TYPES
+
+def _expand_inputs(file_name: Union[str, Path, List], file_type: Optional[str]) -> Optional[List[Path]]:
+    """
+    多文件输入展开为按文件名排序的分片列表，单个文件返回 None
+    支持路径列表、glob 表达式（如 `data/*.jsonl.gz`、`data/**/*.jsonl`）、目录和分片写入的 manifest
+    目录下只收集 file_type（未指定时为所有支持的格式）对应的文件，跳过 manifest（按内容判断，同名的普通 json 不会被跳过）
+    展开结果为空时抛出 FileNotFoundError，与读取不存在的单个文件一致
+    """
+    if isinstance(file_name, (list, tuple)):
+        shards = [Path(path) for path in file_name]
+    else:
+        path = Path(file_name)
+        if is_manifest(path):
+            shards = read_manifest(path)
+        elif isinstance(file_name, str) and not path.exists() and any(char in file_name for char in "*?["):
+            shards = sorted(Path(p) for p in glob.glob(file_name, recursive=True) if Path(p).is_file())
+        elif path.is_dir():
+            wanted = (file_type,) if file_type else _READABLE_TYPES
+            shards = sorted(p for p in path.iterdir() if p.is_file() and not is_manifest(p) and split_compression(p)[0] in wanted)
+        else:
+            return None
+    if not shards:
+        raise FileNotFoundError(f"没有找到可读取的文件: {file_name}")
+    return shards
+
+def _load_shard(file_name: Path, process_fn: Optional[Callable[[Any], Any]], dedup_on: Optional[str], json_backend: str, iter_kwargs: Dict) -> List:
+    """
+    线程/子进程中执行：读取单个分片，完成过滤、分片内去重与 process_fn
+    指定 dedup_on 时返回 [(去重键, 数据), ...]，由主线程做全局去重
+    """
+    set_json_backend(json_backend)
+    columns = iter_kwargs.get("columns")
+    # 去重键由主线程使用，投影后才去掉
+    read_columns = columns + [dedup_on] if columns is not None and dedup_on is not None and dedup_on not in columns else columns
+    result = []
+    for item in iter_file(file_name, dedup_on=dedup_on, **{**iter_kwargs, "columns": read_columns}):
+        key = item[dedup_on] if dedup_on is not None else None
+        if read_columns is not columns:
+            item = _project(item, columns)
+        if process_fn:
+            item = process_fn(item)
+            if item is None:
+                continue
+        result.append((key, item) if dedup_on is not None else item)
+    return result
+
+def _import_pyarrow():
+    """pyarrow 为可选依赖，使用时才导入"""
+    try:
+        import pyarrow
+    except ImportError as e:
+        raise RuntimeError("该功能需要安装 pyarrow: pip install pyarrow") from e
+    return pyarrow
+
+def _parquet_row_groups(parquet_file, data_length: Optional[int]) -> List[int]:
+    """根据 row group 元数据只选出覆盖前 data_length 行所需的 row group"""
+    if data_length is None:
+        return list(range(parquet_file.num_row_groups))
+    row_groups, rows = [], 0
+    for i in range(parquet_file.num_row_groups):
+        if rows >= data_length:
+            break
+        row_groups.append(i)
+        rows += parquet_file.metadata.row_group(i).num_rows
+    return row_groups
+
+def _read_arrow_table(file_name: Path, file_type: str, data_length: Optional[int], columns: Optional[List[str]]) -> Any:
+    """parquet/arrow(feather) 直接读取为 pyarrow.Table，多线程解码，data_length 只读取需要的 row group"""
+    _import_pyarrow()
+    if file_type == "parquet":
+        import pyarrow.parquet as pq
+        parquet_file = pq.ParquetFile(file_name, memory_map=True)
+        table = parquet_file.read_row_groups(_parquet_row_groups(parquet_file, data_length), columns=columns, use_threads=True)
+    else:
+        import pyarrow.feather as feather
+        table = feather.read_table(file_name, columns=columns, memory_map=True, use_threads=True)
+    if data_length is not None:
+        table = table.slice(0, data_length)
+    return table
+
+def _iter_arrow(file_name: Path, file_type: str, data_length: Optional[int], chunk_size: int, columns: Optional[List[str]] = None) -> Iterator[Dict]:
+    """parquet/arrow(feather) 按 record batch 流式读取，每个 batch 转为 dict 后逐条 yield"""
+    pa = _import_pyarrow()
+    if file_type == "parquet":
+        import pyarrow.parquet as pq
+        parquet_file = pq.ParquetFile(file_name, memory_map=True)
+        row_groups = _parquet_row_groups(parquet_file, data_length)
+        batches = parquet_file.iter_batches(batch_size=chunk_size, row_groups=row_groups, columns=columns, use_threads=True)
+    else:
+        reader = pa.ipc.open_file(pa.memory_map(str(file_name)))
+        batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+        if columns is not None:
+            batches = (batch.select(columns) for batch in batches)
+
+    remaining = data_length
+    for batch in batches:
+        if remaining is not None:
+            if remaining <= 0:
+                return
+            batch = batch.slice(0, remaining)
+            remaining -= batch.num_rows
+        yield from batch.to_pylist()
+
+def _to_arrow_table(data: Any) -> Any:
+    """list[dict] 转为 pyarrow.Table"""
+    pa = _import_pyarrow()
+    if isinstance(data, pa.Table):
+        return data
+    if isinstance(data, pd.DataFrame):
+        return pa.Table.from_pandas(data, preserve_index=False)
+    if not isinstance(data, list):
+        raise RuntimeError(f"保存 parquet/arrow 时数据必须是 list[dict]，收到的类型是: {type(data)}")
+    try:
+        return pa.Table.from_pylist(data)
+    except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+        raise RuntimeError(f"数据无法转换为 Arrow 表，同一字段的类型需要一致: {e}") from e
+
+def _read_dataframe(file_name: Path, file_type: str, encoding: str, data_length: Optional[int], na_filter: bool, columns: Optional[List[str]], **kwargs) -> pd.DataFrame:
+    """csv/xlsx 直接读取为一个 DataFrame，多个 sheet 会纵向拼接"""
+    if columns is not None:
+        kwargs["usecols"] = columns
+    if file_type == "csv":
+        return pd.read_csv(file_name, encoding=encoding, nrows=data_length, na_filter=na_filter, **kwargs)
+
+    sheet_name_arg = kwargs.pop("sheet_name", 0)
+    if sheet_name_arg == "all":
+        sheet_name_arg = None
+    dfs_result = pd.read_excel(file_name, sheet_name=sheet_name_arg, nrows=data_length, na_filter=na_filter, **kwargs)
+    if isinstance(dfs_result, dict):
+        dfs_result = pd.concat(list(dfs_result.values()), ignore_index=True) if dfs_result else pd.DataFrame()
+        if data_length:
+            dfs_result = dfs_result.head(data_length)
+    return dfs_result
+
+def _dataframe_to_output(df: pd.DataFrame, output_type: str) -> Any:
+    """DataFrame 转为列式输出"""
+    match output_type:
+        case "columns":
+            return df.to_dict(orient="list")
+        case "dataframe":
+            return df
+        case "arrow":
+            return _import_pyarrow().Table.from_pandas(df, preserve_index=False)
+
+def _columns_to_output(data: Dict[str, list], output_type: str) -> Any:
+    """列字典转为列式输出"""
+    match output_type:
+        case "columns":
+            return data
+        case "dataframe":
+            return pd.DataFrame(data)
+        case "arrow":
+            return _import_pyarrow().Table.from_pydict(data)
+
 def read_file(
-    file_name: Union[str, Path],
+    file_name: Union[str, Path, List[Union[str, Path]]],
     *,
-    output_type: Literal["list", "dict", "set"] = "list",
+    output_type: Literal["list", "dict", "set", "columns", "dataframe", "arrow"] = "list",
     file_type: Optional[str] = None,
     main_key_column: Optional[str] = None,
     encoding: str = "utf-8",
@@ -93,34 +475,134 @@ def read_file(
     data_length: Optional[int] = None,
     process_fn: Optional[Callable[[Any], Any]] = None,
     na_filter: bool = False,
+    num_workers: Optional[int] = None,
+    ordered: bool = True,
+    count_lines: bool = False,
+    chunk_size: int = 100000,
+    xlsx_engine: Literal["pandas", "stream"] = "pandas",
+    columns: Optional[List[str]] = None,
+    where: Optional[Callable[[Any], bool]] = None,
+    exclude_keys: Optional[Container] = None,
+    dedup_on: Optional[str] = None,
+    compression_threads: int = 0,
+    shard_executor: Literal["thread", "process"] = "thread",
+    cache: Union[bool, str, Path, DiskCache, None] = None,
+    memo: Union[bool, MemoryCache, None] = None,
     **kwargs
-) -> Union[List, Dict, Set]:
+) -> Union[List, Dict, Set, pd.DataFrame, Any]:
     """
     读取文件，根据传参来判断读取的方式。
     支持限制读取条数 (data_length)，针对 jsonl, csv, xlsx 进行了内存/IO优化。
 
     Args:
-        file_name (str|Path): 文件路径
-        output_type (Literal["list", "dict", "set"]): 返回容器类型
-        file_type (str): 文件后缀，如 `json`, `jsonl`, `xlsx`, `csv`
+        file_name (str|Path|list): 文件路径；也可以是 glob 表达式、目录、路径列表或分片写入的 manifest，此时多个分片并发读取后合并
+        output_type (Literal["list", "dict", "set", "columns", "dataframe", "arrow"]): 返回容器类型
+            - columns: 按列存储的 dict[str, list]，缺失的字段补 None
+            - dataframe: pd.DataFrame；csv/xlsx 在没有 process_fn 与过滤条件时直接返回，不经过逐行 dict 转换
+            - arrow: pyarrow.Table，需要安装 pyarrow，同一列的类型需要一致（csv/xlsx 建议配合 na_filter=True）
+        file_type (str): 文件后缀，如 `json`, `jsonl`, `xlsx`, `csv`, `parquet`, `arrow`/`feather`（后两者需要安装 pyarrow）
         main_key_column (str): 当返回为dict/set时，作为主键的列名
         encoding (str): 文件编码方式
         disable_tqdm (bool): 是否关闭进度条
-        data_length (int): 读取的数据条数（支持 jsonl/csv/xlsx 的局部读取优化）
+        data_length (int): 读取的数据条数（支持 jsonl/csv/xlsx 的局部读取优化，parquet 只读取需要的 row group）
         process_fn (Callable): 支持读取时直接做处理
         na_filter (bool): 是否将空值转换为NaN，默认为False（空值保持为空字符串）
+        num_workers (int): jsonl 多进程解析的进程数，文件按行对齐的字节段切分后并行解析，
+            process_fn 在子进程中执行（需可被 pickle，不能是 lambda）。仅在 data_length 为 None 时生效；
+            多文件输入时为同时读取的分片数，默认与 ThreadPoolExecutor/ProcessPoolExecutor 一致
+        ordered (bool): 多进程解析或多文件读取时是否保持原始顺序，为 False 时按完成顺序合并
+        count_lines (bool): jsonl 全量读取时是否先统计行数作为进度条总数，默认按读取字节数显示进度（只读一遍文件）
+        chunk_size (int): csv 分块读取时每块的行数（未指定 dtype 时各列类型以第一块推断的结果为准），parquet 每个 record batch 的行数
+        xlsx_engine (str): xlsx 的读取方式，`pandas` 使用 pd.read_excel；`stream` 使用 openpyxl 只读模式逐行读取，
+            不构建整个工作簿，data_length 跨 sheet 生效且读够即停，但不支持 pd.read_excel 的其他参数
+        columns (list[str]): 只读取这些字段，在 process_fn 之前生效。csv/xlsx 使用 usecols，
+            json/jsonl 解析出完整的对象后立即丢弃其他字段，parquet/arrow 只解码这些列。
+            过滤在投影之前执行：exclude_keys/dedup_on 用到的字段会一起读取后再去掉，指定 where 时读取完整的行
+        where (Callable): 读取时的过滤条件，返回 False 的数据不会被存储，在 process_fn 之前执行
+        exclude_keys (set): main_key_column 的值在该集合中的数据会被跳过，等价于读取后再调用 filter_fn
+        dedup_on (str): 按该字段去重，保留第一次出现的数据，等价于读取后再调用 drop_duplicates
+        compression_threads (int): 压缩文件(.gz/.bz2/.xz/.zst)的解压线程数，gzip 多线程解压需要安装 python-isal
+        shard_executor (str): 多文件输入时使用线程池(`thread`)还是进程池(`process`)读取分片。
+            多文件输入时 data_length 为全局条数，按顺序逐个分片读取，读够即停
+        cache (bool|str|Path|DiskCache): 磁盘缓存解析结果，True 使用默认目录 ~/.cache/bedrockx，
+            str/Path 指定缓存目录。源文件的大小或 mtime 变化、读取参数或 process_fn/where 的代码变化后缓存失效，
+            注意 process_fn 内部引用的全局变量变化不会使缓存失效，此时需要调用 DiskCache.invalidate；
+            绑定方法与可调用对象以实例的 repr（含内存地址时为 pickle 哈希）区分，都无法使用时不缓存
+        memo (bool|MemoryCache): 进程内缓存解析结果，True 使用全局的 MemoryCache。每次读取只做一次 stat() 校验，
+            命中时直接返回缓存中的同一个对象（不要修改它），适合服务中反复读取的小文件。可以与 cache 同时使用，
+            process_fn/where 的标识规则与 cache 相同
         **kwargs:
             - sheet_name (str): 读取xlsx时指定，默认为第一个。传 "all" 读取所有 sheet。
     """
     
+    # 0. 进程内/磁盘缓存：命中时直接返回，未命中时正常读取后写入缓存
+    # MemoryCache 定义了 __len__，空缓存为假值，不能直接用 if memo 判断
+    use_memo = memo is True or isinstance(memo, MemoryCache)
+    if cache or use_memo:
+        arguments = dict(locals())
+        arguments.pop("use_memo")
+        sources = _expand_inputs(file_name, file_type)
+        if sources is None:
+            sources = [Path(file_name)]
+        # 只影响速度和进度条的参数不计入 key
+        options = {
+            name: value for name, value in arguments.items()
+            if name not in ("file_name", "cache", "memo", "kwargs", "disable_tqdm", "num_workers", "count_lines", "chunk_size", "compression_threads", "shard_executor")
+        }
+        arguments.update(arguments.pop("kwargs"))
+        arguments["cache"] = None
+        arguments["memo"] = None
+        try:
+            options.update(
+                process_fn=callable_identity(process_fn),
+                where=callable_identity(where),
+                exclude_keys=None if exclude_keys is None else sorted(map(repr, exclude_keys)),
+                kwargs=sorted(kwargs.items()),
+            )
+        except RuntimeError as e:
+            # process_fn/where 没有跨实例稳定的标识时，缓存可能返回其他函数的结果，直接读取
+            base_logger.warning(f"{e}，本次读取不使用缓存")
+            return read_file(**arguments)
+
+        result = None
+        if use_memo:
+            memory_cache = default_memory_cache if memo is True else memo
+            memo_key = memory_cache.make_key(sources, options)
+            # 在读取之前获取文件状态，读取过程中文件发生变化时，缓存的旧结果会在下次 get 时失效
+            memo_stats = memory_cache.stat(sources)
+            result = memory_cache.get(memo_key, sources, memo_stats)
+            if result is not None:
+                return result
+        if cache:
+            disk_cache = cache if isinstance(cache, DiskCache) else DiskCache(None if cache is True else cache)
+            key = disk_cache.make_key(sources, options)
+            result = disk_cache.get(key)
+        if result is None:
+            result = read_file(**arguments)
+            if cache:
+                disk_cache.set(key, result)
+        if use_memo:
+            memory_cache.set(memo_key, sources, result, memo_stats)
+        return result
+
     # 1. 路径与类型预处理
-    if isinstance(file_name, str):
-        file_name = Path(file_name)
-        
-    if file_type is None:
-        file_type = file_name.suffix.lstrip(".").lower()
+    shards = _expand_inputs(file_name, file_type)
+    compression = None
+    if shards is None:
+        if isinstance(file_name, str):
+            file_name = Path(file_name)
+
+        # 从后缀链中识别压缩格式，如 data.jsonl.gz -> ("jsonl", "gzip")
+        suffix_type, compression = split_compression(file_name)
+        if file_type is None:
+            file_type = suffix_type
+        if compression is not None and file_type in _NO_COMPRESSION_TYPES:
+            raise RuntimeError(f"不支持读取压缩的 {file_type} 文件: {file_name}")
+        if compression is not None and num_workers and num_workers > 1:
+            base_logger.warning("压缩文件无法按字节切分，num_workers 不生效，将单进程读取")
 
     # 2. 初始化容器
+    columnar = output_type in _COLUMNAR_OUTPUT
     match output_type:
         case "list":
             return_data = []
@@ -128,24 +610,68 @@ def read_file(
             return_data = {}
         case "set":
             return_data = set()
+        case "columns" | "dataframe" | "arrow":
+            # 列式存储: {字段名: [值, ...]}，最后再按需转为 DataFrame/Arrow
+            return_data = {}
+            row_count = 0
         case _:
-            raise RuntimeError(f"output_type 参数错误: {output_type}。仅允许 `list`, `dict`, `set`")
+            raise RuntimeError(f"output_type 参数错误: {output_type}。仅允许 `list`, `dict`, `set`, `columns`, `dataframe`, `arrow`")
+
+    if exclude_keys is not None and not main_key_column:
+        raise RuntimeError("使用 exclude_keys 时必须指定 main_key_column")
+    has_filter = where is not None or exclude_keys is not None or dedup_on is not None
+    # 过滤需要的字段也要读取，过滤后再投影到 columns
+    output_columns = columns
+    columns = _filter_read_columns(columns, where, exclude_keys, main_key_column, dedup_on)
+    seen_keys = set()
 
     # --- 内部核心逻辑：统一的数据添加器 ---
     # 定义这个闭包函数，避免在每个 case 里重复写 if list/elif dict/elif set
     def _add_item(item: Any):
-        """处理 process_fn 并将数据添加到容器"""
-        nonlocal return_data
-        
-        # 1. 如果有预处理函数，先执行转换
+        """过滤、处理 process_fn 并将数据添加到容器"""
+        # 1. 读取循环内直接过滤，被丢弃的数据不会进入容器
+        if has_filter:
+            if not _keep_row(item, where, exclude_keys, main_key_column):
+                return
+            if dedup_on is not None:
+                key = _dedup_key(item, dedup_on)
+                if key is _MISSING or key in seen_keys:
+                    return
+                seen_keys.add(key)
+            if columns is not output_columns:
+                item = _project(item, output_columns)
+
+        # 2. 如果有预处理函数，先执行转换
         if process_fn:
             item = process_fn(item)
             # 如果函数返回 None，则跳过该条数据（起到过滤作用）
             if item is None:
                 return
 
-        # 2. 添加到容器
-        if isinstance(return_data, list):
+        # 3. 添加到容器
+        _store_item(item)
+
+    def _store_item(item: Any):
+        """将已经处理过的数据添加到容器"""
+        nonlocal return_data, row_count
+
+        if columnar:
+            if not isinstance(item, dict):
+                raise RuntimeError(f"output_type='{output_type}' 时每条数据必须是 dict\n数据内容: {item}")
+            for key, value in item.items():
+                column = return_data.get(key)
+                if column is None:
+                    # 新出现的字段，之前的行补 None
+                    column = return_data[key] = [None] * row_count
+                column.append(value)
+            row_count += 1
+            # 当前数据缺少部分字段时补 None，保证各列等长
+            if len(item) != len(return_data):
+                for column in return_data.values():
+                    if len(column) < row_count:
+                        column.append(None)
+
+        elif isinstance(return_data, list):
             return_data.append(item)
             
         elif isinstance(return_data, dict):
@@ -171,21 +697,113 @@ def read_file(
                 else:
                     raise RuntimeError(f"返回set集合时，若需要使用process_fn，则需要返回str 或 int对象")
 
+    # 列式输出且不需要逐行处理时，csv/xlsx 直接返回 DataFrame，跳过逐行 dict 转换
+    if columnar and shards is None and process_fn is None and not has_filter and (file_type == "csv" or (file_type in ("xlsx", "xls") and xlsx_engine == "pandas")):
+        df = _read_dataframe(file_name, file_type, encoding, data_length, na_filter, columns, **kwargs)
+        return _dataframe_to_output(df, output_type)
+    # parquet/arrow 本身就是列式存储，直接多线程读取为 Table
+    if columnar and shards is None and process_fn is None and not has_filter and file_type in _ARROW_TYPES:
+        table = _read_arrow_table(file_name, file_type, data_length, columns)
+        match output_type:
+            case "columns":
+                return table.to_pydict()
+            case "dataframe":
+                return table.to_pandas()
+            case "arrow":
+                return table
+
     # 3. 根据文件类型分发处理
     match file_type:
+        # ---------------- 多文件 (glob/目录/路径列表) ----------------
+        case _ if shards is not None:
+            iter_kwargs = dict(
+                file_type=file_type, encoding=encoding, na_filter=na_filter, chunk_size=chunk_size,
+                columns=columns, compression_threads=compression_threads, **kwargs,
+            )
+            if data_length:
+                # 全局 data_length：按顺序逐个分片读取，读够即停
+                remaining = data_length
+                with tqdm(total=data_length, disable=disable_tqdm) as p_bar:
+                    for shard in shards:
+                        for item in iter_file(shard, data_length=remaining, **iter_kwargs):
+                            _add_item(item)
+                            remaining -= 1
+                            p_bar.update(1)
+                        if remaining <= 0:
+                            break
+            else:
+                # 分片并发读取，过滤与 process_fn 在线程/子进程中执行，主线程负责全局去重与合并
+                executor_cls = ProcessPoolExecutor if shard_executor == "process" else ThreadPoolExecutor
+                # 过滤与投影都在 iter_file 中完成
+                iter_kwargs.update(columns=output_columns, where=where, exclude_keys=exclude_keys, main_key_column=main_key_column)
+                with executor_cls(max_workers=num_workers) as executor, \
+                    tqdm(total=len(shards), unit="file", disable=disable_tqdm) as p_bar:
+                    futures = [
+                        executor.submit(_load_shard, shard, process_fn, dedup_on, get_json_backend(), iter_kwargs)
+                        for shard in shards
+                    ]
+                    for future in (futures if ordered else as_completed(futures)):
+                        for item in future.result():
+                            if dedup_on is not None:
+                                key, item = item
+                                if key in seen_keys:
+                                    continue
+                                seen_keys.add(key)
+                            _store_item(item)
+                        p_bar.update(1)
+
         # ---------------- JSONL (流式优化) ----------------
+        case "jsonl" if num_workers and num_workers > 1 and data_length is None and compression is None:
+            # 多进程解析：按行对齐的字节段切分，每个进程解析一段并执行 process_fn
+            ranges = _split_jsonl_ranges(file_name, num_workers * 4)
+            with ProcessPoolExecutor(max_workers=num_workers) as executor, \
+                tqdm(total=file_name.stat().st_size, unit="B", unit_scale=True, disable=disable_tqdm) as p_bar:
+                futures = {
+                    executor.submit(
+                        _parse_jsonl_range, file_name, start, end, encoding, process_fn, get_json_backend(),
+                        output_columns, where, exclude_keys, main_key_column, dedup_on,
+                    ): end - start
+                    for start, end in ranges
+                }
+                for future in (futures if ordered else as_completed(futures)):
+                    for item in future.result():
+                        if dedup_on is not None:
+                            key, item = item
+                            if key in seen_keys:
+                                continue
+                            seen_keys.add(key)
+                        _store_item(item)
+                    p_bar.update(futures[future])
+
         case "jsonl":
-            with file_name.open("r", encoding=encoding) as f:
+            loads = get_json_codec().loads
+            # 为了 tqdm 显示进度，如果知道 data_length，则传入 total
+            # 否则默认按已读取字节数/文件大小显示，避免为了计算行数把文件完整读一遍
+            # 压缩文件解压后的大小未知，也无法预先统计行数，只显示处理速度
+            by_bytes = not data_length and not count_lines and compression is None
+            if by_bytes:
+                p_bar = tqdm(total=file_name.stat().st_size, unit="B", unit_scale=True, disable=disable_tqdm)
+            else:
+                total_count = data_length or (_get_line_count(file_name) if compression is None else None)
+                p_bar = tqdm(total=total_count, disable=disable_tqdm)
+
+            with open_file(file_name, "r", encoding=encoding, compression=compression, threads=compression_threads) as f, p_bar:
                 # 使用 islice 实现流式读取，不加载全文件，读够即停
                 # 注意：如果 data_length 为 None，islice(f, None) 会读取全部
                 iterator = islice(f, data_length)
-                
-                # 为了 tqdm 显示进度，如果知道 data_length，则传入 total
-                total_count = data_length if data_length else _get_line_count(file_name)
-                
-                for line in tqdm(iterator, total=total_count, disable=disable_tqdm):
+                raw = f.buffer
+                consumed = 0
+
+                for line in iterator:
+                    if by_bytes:
+                        # 底层 buffer 的位置按块前进，只在变化时更新进度条
+                        if (pos := raw.tell()) != consumed:
+                            p_bar.update(pos - consumed)
+                            consumed = pos
+                    else:
+                        p_bar.update(1)
                     if line := line.strip():
-                        item = json.loads(line)
+                        item = _project(loads(line), columns)
                         _add_item(item)
                         
                         # 双重保险：对于 dict/set 去重后可能数量变少，
@@ -195,13 +813,18 @@ def read_file(
         # ---------------- CSV (Pandas nrows 优化) ----------------
         case "csv":
 
-            # 利用 pd.read_csv 的 nrows 参数只读取前 N 行
-            df = pd.read_csv(file_name, encoding=encoding, nrows=data_length, na_filter=na_filter, **kwargs)
-
-            # 转换由于 pandas iterrows 较慢，直接转 dict list 处理更快
-            records = df.to_dict(orient="records")
+            # 利用 pd.read_csv 的 nrows 参数只读取前 N 行，chunksize 分块读取
+            # 每个块转为 dict list 后立即消费并释放，峰值内存约为一个块加上输出结果
+            for row in tqdm(_iter_csv(file_name, encoding, data_length, na_filter, chunk_size, columns, **kwargs), total=data_length, disable=disable_tqdm):
+                _add_item(row)
 
-            for row in tqdm(records, disable=disable_tqdm):
+        # ---------------- XLSX (openpyxl 只读模式流式读取) ----------------
+        case "xlsx" if xlsx_engine == "stream":
+            sheet_name_arg = kwargs.pop("sheet_name", 0)
+            if kwargs:
+                base_logger.warning(f"xlsx_engine='stream' 不支持参数 {list(kwargs)}，已忽略")
+            # 逐行读取，跨 sheet 累计 data_length，读够即停
+            for row in tqdm(_iter_xlsx(file_name, data_length, na_filter, sheet_name_arg, columns), total=data_length, disable=disable_tqdm):
                 _add_item(row)
 
         # ---------------- XLSX (Pandas nrows + Sheet 逻辑) ----------------
@@ -213,6 +836,8 @@ def read_file(
                 sheet_name_arg = None # pandas 传 None 会读取所有 sheet 返回 dict
 
             # 读取数据 (利用 nrows 优化)
+            if columns is not None:
+                kwargs["usecols"] = columns
             dfs_result = pd.read_excel(file_name, sheet_name=sheet_name_arg, nrows=data_length, na_filter=na_filter, **kwargs)
             
             all_records = []
@@ -233,61 +858,335 @@ def read_file(
             for row in tqdm(all_records, disable=disable_tqdm):
                 _add_item(row)
 
+        # ---------------- Parquet / Arrow (pyarrow 按 batch 读取) ----------------
+        case "parquet" | "arrow" | "feather":
+            # parquet 按 row group 元数据只读取覆盖 data_length 的部分，列投影在解码时生效
+            for row in tqdm(_iter_arrow(file_name, file_type, data_length, chunk_size, columns), total=data_length, disable=disable_tqdm):
+                _add_item(row)
+
         # ---------------- JSON (标准库限制) ----------------
         case "json":
-            with file_name.open("rb") as f:
-                # 'item' 指示 ijson 解析根级数组中的每个元素
-                # 这要求 JSON 文件的根必须是列表 [ ... ]
-                try:
-                    iterator = ijson.items(f, 'item')
-                    
-                    # 1. 如果指定了读取条数，使用 islice 进行切片 (读够即停)
-                    if data_length:
-                        iterator = islice(iterator, data_length)
-                        total_count = data_length
-                    else:
-                        # 全量读取时，ijson 无法预知总条数，tqdm 只能显示处理速度
-                        total_count = None 
-
-                    # 2. 迭代处理
-                    for row in tqdm(iterator, total=total_count, disable=disable_tqdm):
-                        _add_item(row)
-                        
-                except ijson.common.IncompleteJSONError as e:
-                    # 处理可能的 JSON 格式错误或文件截断
-                    raise RuntimeError("JSON 文件格式错误或不完整") from e
+            # 如果指定了读取条数，使用 islice 进行切片 (读够即停)
+            # 全量读取时，ijson 无法预知总条数，tqdm 只能显示处理速度
+            for row in tqdm(_iter_json(file_name, data_length, columns, compression, compression_threads), total=data_length, disable=disable_tqdm):
+                _add_item(row)
 
         case _:
             raise RuntimeError(f"不支持的文件格式: {file_type}。请检查后缀或显式传入 file_type")
 
+    if columnar:
+        return _columns_to_output(return_data, output_type)
     return return_data
 
+def iter_file(
+    file_name: Union[str, Path],
+    *,
+    file_type: Optional[str] = None,
+    encoding: str = "utf-8",
+    data_length: Optional[int] = None,
+    process_fn: Optional[Callable[[Any], Any]] = None,
+    na_filter: bool = False,
+    chunk_size: int = 100000,
+    columns: Optional[List[str]] = None,
+    where: Optional[Callable[[Any], bool]] = None,
+    exclude_keys: Optional[Container] = None,
+    main_key_column: Optional[str] = None,
+    dedup_on: Optional[str] = None,
+    compression_threads: int = 0,
+    **kwargs
+) -> Iterator[Any]:
+    """
+    read_file 的惰性版本，逐条 yield 数据，内存占用与文件大小无关。
+    jsonl/json 逐条解析，csv 按 chunk_size 分块读取，xlsx 使用 openpyxl 只读模式逐行读取。
+
+    Args:
+        file_name (str|Path): 文件路径
+        file_type (str): 文件后缀，如 `json`, `jsonl`, `xlsx`, `csv`
+        encoding (str): 文件编码方式
+        data_length (int): 读取的数据条数
+        process_fn (Callable): 对每条数据做处理，返回 None 的数据会被跳过
+        na_filter (bool): 是否将空值转换为NaN，默认为False（空值保持为空字符串）
+        chunk_size (int): csv 每次读取的行数，parquet 每个 record batch 的行数
+        columns (list[str]): 只读取这些字段，在过滤之后、process_fn 之前生效。
+            exclude_keys/dedup_on 用到的字段会一起读取后再去掉；指定 where 时读取完整的行
+        where (Callable): 过滤条件，返回 False 的数据会被跳过，在 process_fn 之前执行
+        exclude_keys (set): main_key_column 的值在该集合中的数据会被跳过
+        main_key_column (str): exclude_keys 对应的字段
+        dedup_on (str): 按该字段去重，保留第一次出现的数据
+        compression_threads (int): 压缩文件的解压线程数
+        **kwargs:
+            - sheet_name (str): 读取xlsx时指定，默认为第一个。传 "all" 读取所有 sheet。
+            - 其余参数透传给 pd.read_csv
+
+    Yields:
+        Any: 经过 process_fn 处理后的单条数据
+    """
+    if isinstance(file_name, str):
+        file_name = Path(file_name)
+
+    suffix_type, compression = split_compression(file_name)
+    if file_type is None:
+        file_type = suffix_type
+    if compression is not None and file_type in _NO_COMPRESSION_TYPES:
+        raise RuntimeError(f"不支持读取压缩的 {file_type} 文件: {file_name}")
+
+    # 过滤需要的字段也要读取，过滤后再投影到 columns
+    output_columns = columns
+    columns = _filter_read_columns(columns, where, exclude_keys, main_key_column, dedup_on)
+
+    match file_type:
+        case "jsonl":
+            iterator = _iter_jsonl(file_name, encoding, data_length, columns, compression, compression_threads)
+        case "csv":
+            iterator = _iter_csv(file_name, encoding, data_length, na_filter, chunk_size, columns, **kwargs)
+        case "xlsx":
+            iterator = _iter_xlsx(file_name, data_length, na_filter, kwargs.pop("sheet_name", 0), columns)
+        case "json":
+            iterator = _iter_json(file_name, data_length, columns, compression, compression_threads)
+        case "parquet" | "arrow" | "feather":
+            iterator = _iter_arrow(file_name, file_type, data_length, chunk_size, columns)
+        case _:
+            raise RuntimeError(f"不支持的文件格式: {file_type}。请检查后缀或显式传入 file_type")
+
+    if exclude_keys is not None and not main_key_column:
+        raise RuntimeError("使用 exclude_keys 时必须指定 main_key_column")
+    seen_keys = set()
+
+    for item in iterator:
+        if not _keep_row(item, where, exclude_keys, main_key_column):
+            continue
+        if dedup_on is not None:
+            key = _dedup_key(item, dedup_on)
+            if key is _MISSING or key in seen_keys:
+                continue
+            seen_keys.add(key)
+        if columns is not output_columns:
+            item = _project(item, output_columns)
+        if process_fn:
+            item = process_fn(item)
+            if item is None:
+                continue
+        yield item
+
+_WRITE_BUFFER_SIZE = 1024 * 1024
+
+def _batched(data: Iterable, batch_size: int) -> Iterator[list]:
+    """按 batch_size 切分任意可迭代对象"""
+    iterator = iter(data)
+    while batch := list(islice(iterator, batch_size)):
+        yield batch
+
+def _write_jsonl(f, data: Iterable, ensure_ascii: bool, batch_size: int) -> None:
+    """每个 batch 拼接为一个字符串后写入，减少 write 调用次数"""
+    dumps = get_json_codec().dumps
+    for batch in _batched(data, batch_size):
+        f.write("".join(dumps(item, ensure_ascii) + "\n" for item in batch))
+
+def _encode_jsonl_chunk(chunk: List, ensure_ascii: bool, json_backend: str, encoding: str) -> bytes:
+    """线程/子进程中执行：将一个 chunk 序列化为 jsonl 字节块"""
+    dumps = get_json_codec(json_backend).dumps
+    return "".join(dumps(item, ensure_ascii) + "\n" for item in chunk).encode(encoding)
+
+def _write_jsonl_parallel(f, data: Iterable, ensure_ascii: bool, batch_size: int, encoding: str, num_workers: int, executor: str) -> None:
+    """
+    按 batch_size 切分后在线程池/进程池中并行序列化，主线程按原始顺序写入字节块
+    在途的 chunk 不超过 num_workers 的 2 倍，生成器输入时内存占用有上限
+    """
+    executor_cls = ProcessPoolExecutor if executor == "process" else ThreadPoolExecutor
+    json_backend = get_json_backend()
+    with executor_cls(max_workers=num_workers) as pool:
+        pending = deque()
+        for chunk in _batched(data, batch_size):
+            pending.append(pool.submit(_encode_jsonl_chunk, chunk, ensure_ascii, json_backend, encoding))
+            if len(pending) >= num_workers * 2:
+                f.write(pending.popleft().result())
+        while pending:
+            f.write(pending.popleft().result())
+
+# json_indent="auto" 时，不超过该条数的 list/dict 使用 4 空格缩进，否则每行一条的紧凑格式
+_JSON_AUTO_INDENT_LIMIT = 10000
+
+def _write_json(f, data: Iterable, ensure_ascii: bool, indent: Union[int, str, None], batch_size: int) -> None:
+    """
+    流式写入 json 数组，逐条序列化后分批写入，支持生成器；dict 按 key 逐个写入，str 与数字等标量整体写入
+    indent 为 None 时使用当前 json 后端紧凑序列化，每行一条；否则输出与 json.dump(data, indent=indent) 一致
+    """
+    if indent is None:
+        dumps = get_json_codec().dumps
+    else:
+        prefix = " " * indent if isinstance(indent, int) else indent
+
+        def dumps(obj: Any, ensure_ascii: bool) -> str:
+            return json.dumps(obj, ensure_ascii=ensure_ascii, indent=indent, default=str)
+
+    if isinstance(data, (str, bytes)) or not isinstance(data, Iterable):
+        # 字符串、数字等不是容器的根，与 json.dump 一样整体序列化
+        f.write(dumps(data, ensure_ascii))
+        return
+
+    if isinstance(data, dict):
+        open_bracket, close_bracket = "{", "}"
+        # 序列化 {key: value} 后去掉外层花括号即为 "key": value，非 str 的 key 与整体序列化时的处理一致
+        # 缩进时去掉的是 "{\n" 和 "\n}"，剩余部分已经带有一层缩进
+        strip = 1 if indent is None else 2
+        items = (dumps({key: value}, ensure_ascii)[strip:-strip] for key, value in data.items())
+    else:
+        open_bracket, close_bracket = "[", "]"
+        items = (dumps(item, ensure_ascii) for item in data)
+        if indent is not None:
+            # json 字符串内不会出现原始换行符，可以安全地按行缩进
+            items = (prefix + text.replace("\n", "\n" + prefix) for text in items)
+
+    written = False
+    for batch in _batched(items, batch_size):
+        f.write((",\n" if written else open_bracket + "\n") + ",\n".join(batch))
+        written = True
+    f.write("\n" + close_bracket if written else open_bracket + close_bracket)
+
+def _write_csv(f, data: Iterable, schema: Optional[List[str]], batch_size: int, pd_index: bool, **kwargs) -> None:
+    """
+    分批写入 csv，表头来自 schema、list 中所有字段的并集或第一个 batch
+    之后的 batch 按表头对齐，缺失字段留空，多出的字段丢弃
+    """
+    header = schema
+    if header is None and isinstance(data, list) and data and isinstance(data[0], dict):
+        header = list(dict.fromkeys(key for item in data for key in item))
+
+    row_offset = 0
+    warned = False
+    for batch in _batched(data, batch_size):
+        df = pd.DataFrame(batch)
+        if header is None:
+            header = list(df.columns)
+        elif not warned and (extra := [column for column in df.columns if column not in header]):
+            base_logger.warning(f"字段 {extra} 不在 csv 表头中，将被丢弃。可以通过 schema 指定完整的表头")
+            warned = True
+        df = df.reindex(columns=header)
+        df.index += row_offset
+        df.to_csv(f, header=row_offset == 0, index=pd_index, **kwargs)
+        row_offset += len(df)
+
+    if row_offset == 0 and header:
+        pd.DataFrame(columns=header).to_csv(f, index=pd_index, **kwargs)
+
+def _excel_value(value: Any) -> Any:
+    """转为 openpyxl 可以写入的值，NaN 写为空单元格"""
+    if value is None or isinstance(value, str):
+        return value
+    if isinstance(value, (list, dict)):
+        return json_dumps(value)
+    if pd.api.types.is_scalar(value) and pd.isna(value):
+        return None
+    if isinstance(value, numbers.Number) or hasattr(value, "isoformat"):
+        return value
+    return str(value)
+
+def _write_xlsx_stream(file_name: Path, data: Iterable, schema: Optional[List[str]], sheet_name: str = "Sheet1") -> None:
+    """openpyxl 只写模式逐行写入 xlsx，不在内存中保留整个工作簿"""
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet(sheet_name)
+    header = schema
+    if header is not None:
+        sheet.append(header)
+    for item in data:
+        if header is None:
+            header = list(item)
+            sheet.append(header)
+        sheet.append([_excel_value(item.get(column)) for column in header])
+    workbook.save(file_name)
+
+def _write_arrow(file_name: Path, file_type: str, data: Iterable, schema: Optional[List[str]], batch_size: int, **kwargs) -> None:
+    """
+    parquet/arrow(feather) 写入。list 整体转换为一个 Table，其余可迭代对象按 batch 追加写入，
+    schema 以第一个 batch 为准
+    """
+    pa = _import_pyarrow()
+    batches = [data] if isinstance(data, (list, pa.Table, pd.DataFrame)) else _batched(data, batch_size)
+    if file_type == "parquet":
+        import pyarrow.parquet as pq
+        row_group_size = kwargs.pop("row_group_size", None)
+    else:
+        options = pa.ipc.IpcWriteOptions(compression=kwargs.pop("compression", "lz4"))
+
+    writer = None
+    table_schema = None
+    try:
+        for batch in batches:
+            if writer is None:
+                table = _to_arrow_table(batch)
+                if schema is not None:
+                    table = table.select(schema)
+                table_schema = table.schema
+                if file_type == "parquet":
+                    writer = pq.ParquetWriter(file_name, table_schema, **kwargs)
+                else:
+                    writer = pa.ipc.new_file(str(file_name), table_schema, options=options)
+            else:
+                # 之后的 batch 按第一个 batch 的 schema 转换，缺失字段为 null，多出的字段丢弃
+                try:
+                    table = pa.Table.from_pylist(batch, schema=table_schema)
+                except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+                    raise RuntimeError(f"数据无法转换为 Arrow 表，同一字段的类型需要一致: {e}") from e
+            if file_type == "parquet":
+                writer.write_table(table, row_group_size=row_group_size)
+            else:
+                writer.write_table(table)
+        if writer is None:
+            # 空数据也写出一个合法的空文件
+            empty_schema = pa.schema([(column, pa.null()) for column in schema or []])
+            if file_type == "parquet":
+                writer = pq.ParquetWriter(file_name, empty_schema, **kwargs)
+            else:
+                writer = pa.ipc.new_file(str(file_name), empty_schema, options=options)
+    finally:
+        if writer is not None:
+            writer.close()
+
 @overload
-def save_file(file_name: Union[str, Path], data: list, file_type=None, *, encoding="utf-8", ensure_ascii=False, json_indent=4, pd_index=False, **kwargs) -> None:
+def save_file(file_name: Union[str, Path], data: Iterable, file_type=None, *, encoding="utf-8", ensure_ascii=False, json_indent="auto", pd_index=False, compression_threads=0, batch_size=10000, schema=None, shard_rows=None, shard_bytes=None, num_workers=None, executor="process", **kwargs) -> None:
     """第一个参数是文件名，第二个参数是数据"""
     ...
 
 @overload
-def save_file(data: list, file_name: Union[str, Path], file_type=None, *, encoding="utf-8", ensure_ascii=False, json_indent=4, pd_index=False, **kwargs) -> None:
+def save_file(data: Iterable, file_name: Union[str, Path], file_type=None, *, encoding="utf-8", ensure_ascii=False, json_indent="auto", pd_index=False, compression_threads=0, batch_size=10000, schema=None, shard_rows=None, shard_bytes=None, num_workers=None, executor="process", **kwargs) -> None:
     """第一个参数是数据，第二个参数是文件名"""
     ...
 
-def save_file(file_name_or_data, data_or_file_name=None, file_type=None, *, encoding="utf-8", ensure_ascii=False, json_indent=4, pd_index=False, **kwargs) -> None:
+def save_file(file_name_or_data, data_or_file_name=None, file_type=None, *, encoding="utf-8", ensure_ascii=False, json_indent="auto", pd_index=False, compression_threads=0, batch_size=10000, schema=None, shard_rows=None, shard_bytes=None, num_workers=None, executor="process", **kwargs) -> None:
     """
     保存文件，支持两种调用方式：
     1. save_file(file_name, data)  # 第一个参数是文件名
     2. save_file(data, file_name)  # 第一个参数是数据
+
+    data 可以是 list/dict，也可以是任意可迭代对象（如生成器），按 batch_size 分批写入，
+    配合 iter_file 可以实现 读取 -> 处理 -> 保存 全程不把数据整体放进内存
+    - jsonl: 每个 batch 拼接后写入，使用 1MB 写缓冲
+    - json: 流式写入数组，json_indent 为 "auto" 时不超过 1 万条的 list/dict 使用 4 空格缩进，
+      更大的数据或生成器使用每行一条的紧凑格式；为 None 时强制紧凑格式，为 int 时指定缩进
+    - csv: 表头来自 schema、list 中所有字段的并集或第一个 batch，之后的 batch 追加写入
+    - xlsx: list/dict 使用 DataFrame.to_excel，其余可迭代对象使用 openpyxl 只写模式逐行写入
+    - parquet/arrow: 其余可迭代对象按 batch 写为多个 row group/record batch
+    schema (list[str]) 指定 csv/xlsx 的表头或 parquet/arrow 保留的列及顺序
+    shard_rows/shard_bytes 指定后分片写入 jsonl：data_part-00000.jsonl, ... 以及记录分片行数的 data_manifest.json，
+    超过 shard_rows 行或 shard_bytes 字节（未压缩）后滚动到下一个分片，见 ShardedWriter
+    num_workers 大于 1 时 jsonl 按 batch_size 切分后在进程池（executor="process"）或线程池（executor="thread"）中
+    并行序列化，再按原始顺序写入，使用与主进程相同的 json 后端
+
+    文件名以 .gz/.bz2/.xz/.zst 结尾时流式压缩写入，格式由前一个后缀决定，如 data.jsonl.gz
+    compression_threads 为压缩线程数（gzip 需要 python-isal，zstd 需要 zstandard）
+    parquet/arrow(feather) 需要安装 pyarrow，kwargs 透传给 pq.ParquetWriter（如 compression="zstd"），
+    arrow 只支持 compression 参数
     """
     # 判断参数顺序：如果第一个参数是字符串或Path，则按照原来的顺序
     if isinstance(file_name_or_data, (str, Path)):
         file_name = file_name_or_data
         data = data_or_file_name
-    # 如果第一个参数是list或dict，则说明是数据，需要交换顺序
-    elif isinstance(file_name_or_data, (list, dict)):
+    # 如果第一个参数是list、dict或生成器等可迭代对象，则说明是数据，需要交换顺序
+    elif isinstance(file_name_or_data, Iterable):
         data = file_name_or_data
         file_name = data_or_file_name
     else:
-        raise TypeError(f"第一个参数必须是文件名(str/Path)或数据(list/dict)，收到的类型是: {type(file_name_or_data)}")
+        raise TypeError(f"第一个参数必须是文件名(str/Path)或数据(list/dict/可迭代对象)，收到的类型是: {type(file_name_or_data)}")
 
     if data is None:
         raise ValueError("data 参数不能为 None")
@@ -296,23 +1195,50 @@ def save_file(file_name_or_data, data_or_file_name=None, file_type=None, *, enco
         file_name = Path(file_name)
 
     file_name.parent.mkdir(exist_ok=True, parents=True)
+    suffix_type, compression = split_compression(file_name)
     if file_type is None:
-        file_type = file_name.suffix.lstrip(".")
+        file_type = suffix_type
+    if compression is not None and file_type in _NO_COMPRESSION_TYPES:
+        raise RuntimeError(f"不支持保存压缩的 {file_type} 文件: {file_name}")
+
+    if num_workers and num_workers > 1 and (file_type != "jsonl" or shard_rows is not None or shard_bytes is not None):
+        base_logger.warning("num_workers 仅对非分片写入的 jsonl 生效，将单线程序列化")
+
+    if shard_rows is not None or shard_bytes is not None:
+        if file_type != "jsonl":
+            raise RuntimeError(f"分片写入目前仅支持 jsonl，收到的文件格式是: {file_type}")
+        with ShardedWriter(file_name, shard_rows=shard_rows, shard_bytes=shard_bytes, encoding=encoding, ensure_ascii=ensure_ascii, compression_threads=compression_threads) as writer:
+            writer.write_many(data)
+        base_logger.info(f"文件分片保存至 {file_name.parent.resolve()}，共 {len(writer.shards)} 个分片，manifest: {writer.manifest_path.name}")
+        return
 
     match file_type:
+        case "jsonl" if num_workers and num_workers > 1:
+            with open_file(file_name, "wb", compression=compression, threads=compression_threads, buffering=_WRITE_BUFFER_SIZE) as f:
+                _write_jsonl_parallel(f, data, ensure_ascii, batch_size, encoding, num_workers, executor)
         case "jsonl":
-            with file_name.open("w", encoding=encoding) as f:
-                for item in data:
-                    f.write(json.dumps(item, ensure_ascii=ensure_ascii, default=str) + "\n")
+            with open_file(file_name, "w", encoding=encoding, compression=compression, threads=compression_threads, buffering=_WRITE_BUFFER_SIZE) as f:
+                _write_jsonl(f, data, ensure_ascii, batch_size)
         case "json":
-            with file_name.open("w", encoding=encoding) as f:
-                json.dump(data, f, ensure_ascii=ensure_ascii, indent=json_indent, default=str)
+            if json_indent == "auto":
+                small = isinstance(data, (list, dict)) and len(data) <= _JSON_AUTO_INDENT_LIMIT
+                json_indent = 4 if small else None
+            with open_file(file_name, "w", encoding=encoding, compression=compression, threads=compression_threads, buffering=_WRITE_BUFFER_SIZE) as f:
+                _write_json(f, data, ensure_ascii, json_indent, batch_size)
+        case "xlsx" if not isinstance(data, (list, dict)):
+            _write_xlsx_stream(file_name, data, schema, kwargs.get("sheet_name", "Sheet1"))
         case "xlsx":
-            df = pd.DataFrame(data)
+            df = pd.DataFrame(data, columns=schema)
             df.to_excel(file_name, **kwargs, index=pd_index)
-        case "csv":
-            df = pd.DataFrame(data)
+        case "csv" if isinstance(data, dict):
+            df = pd.DataFrame(data, columns=schema)
             df.to_csv(file_name, **kwargs, index=pd_index)
+        case "csv":
+            # newline="" 交给 pandas 控制换行符
+            with open_file(file_name, "w", encoding=encoding, compression=compression, threads=compression_threads, buffering=_WRITE_BUFFER_SIZE, newline="") as f:
+                _write_csv(f, data, schema, batch_size, pd_index, **kwargs)
+        case "parquet" | "arrow" | "feather":
+            _write_arrow(file_name, file_type, data, schema, batch_size, **kwargs)
         case _:
             base_logger.warning(f"不支持的文件格式: {file_type}，将以 jsonl 格式保存")
             fallback = file_name.with_suffix(".jsonl")
@@ -320,9 +1246,8 @@ def save_file(file_name_or_data, data_or_file_name=None, file_type=None, *, enco
             while fallback.exists():
                 fallback = file_name.parent / f"{file_name.stem}_{counter}.jsonl"
                 counter += 1
-            with fallback.open("w", encoding=encoding) as f:
-                for item in data:
-                    f.write(json.dumps(item, ensure_ascii=ensure_ascii, default=str) + "\n")
+            with fallback.open("w", encoding=encoding, buffering=_WRITE_BUFFER_SIZE) as f:
+                _write_jsonl(f, data, ensure_ascii, batch_size)
             file_name = fallback
     base_logger.info(f"文件保存至 {file_name.resolve(strict=True)} ")
 
@@ -337,7 +1262,7 @@ def return_to_jsonl(file_path, encoding="utf-8", ensure_ascii=False):
             error_msg = f"被装饰器的函数需要有返回，并且必须是str或dict"
             
             if isinstance(result, dict):
-                content = json.dumps(result, ensure_ascii=ensure_ascii, default=str)
+                content = json_dumps(result, ensure_ascii)
             elif isinstance(result, str):
                 content = result
             else:
@@ -1,2 +1,3 @@
 from .multi_thread_process import BaseMultiThreading
+from .async_process import BaseAsyncProcessing
 from .data_process import filter_fn, drop_duplicates, remove_columns
\ No newline at end of file
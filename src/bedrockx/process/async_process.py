@@ -0,0 +1,140 @@
+# -*- encoding: utf-8 -*-
+# @Time    :   2026/10/17 19:20:36
+# @File    :   async_process.py
+# @Author  :   ciaoyizhen
+# @Contact :   yizhen.ciao@gmail.com
+# @Function:   基于 asyncio 的协程并发处理，适合大量 I/O 密集的请求
+import asyncio
+from typing import Any, AsyncIterable, Iterable, Sized, Union
+from tqdm import tqdm
+from .multi_thread_process import BaseMultiThreading
+from ..file.background_writer import BackgroundWriter
+
+_STOP = object()
+
+
+class BaseAsyncProcessing(BaseMultiThreading):
+    """
+    BaseMultiThreading 的 asyncio 版本，single_data_process 为 async 函数，边处理边存储
+    构造参数、输出文件、分片写入与 continue_save 的语义与 BaseMultiThreading 一致，max_workers 为并发协程数，
+    协程没有线程栈的开销，可以设置到上千
+
+    用法：
+        class MyProcessor(BaseAsyncProcessing):
+            async def async_post_init(self):
+                self.session = aiohttp.ClientSession()
+
+            async def async_close(self):
+                await self.session.close()
+
+            async def single_data_process(self, item):
+                async with self.session.post(url, json=item) as resp:
+                    return await resp.json()
+
+        MyProcessor(max_workers=1000, save_path="output.jsonl")(data)
+    """
+
+    def __init__(self, *args, **kwargs):
+        if kwargs.get("backend", "thread") != "thread":
+            raise RuntimeError("BaseAsyncProcessing 在事件循环中并发，不支持 backend 参数")
+        super().__init__(*args, **kwargs)
+
+    async def async_post_init(self):
+        """在事件循环中、处理数据之前调用，用于创建 aiohttp.ClientSession 等需要事件循环的资源"""
+        pass
+
+    async def async_close(self):
+        """处理结束后在事件循环中调用，用于释放 async_post_init 中创建的资源"""
+        pass
+
+    async def single_data_process(self, item: dict) -> dict:
+        """
+        这个函数实现单个数据怎么处理，输入是一个数据，进行处理，返回一个数据
+        需要用户自定义实现，必须是 async 函数
+        """
+        raise NotImplementedError(f"未实现函数 single_data_process, 该函数需要解决每个数据要怎么")
+
+    async def run(self, data: Union[Iterable, AsyncIterable]):
+        """
+        在已有的事件循环中处理数据：`await processor.run(data)`
+        data 可以是 list、生成器或异步生成器，按需读取，排队等待处理的数据不超过 max_in_flight 条
+        """
+        total = len(data) if isinstance(data, Sized) else None
+        # 扫描已有输出是同步的文件读取，放到线程中执行，不阻塞事件循环
+        done_keys = await asyncio.to_thread(self._prepare_resume)
+        with tqdm(total=total, desc=f"{self.max_workers}并发处理中") as p_bar, self._open_output() as f:
+            writer = BackgroundWriter(f, flush_every=self.flush_every, flush_interval=self.flush_interval, fsync=self.fsync)
+            pending: asyncio.Queue = asyncio.Queue(maxsize=self.max_in_flight)
+            # 处理结果先进入有界队列，由 forward 统一交给后台写入线程；写入跟不上时 worker 在 results.put 上挂起等待
+            results: asyncio.Queue = asyncio.Queue(maxsize=self.max_in_flight)
+
+            async def put(item):
+                if self._is_done(item, done_keys):
+                    p_bar.update(1)
+                else:
+                    await pending.put(item)
+
+            async def feed():
+                if hasattr(data, "__aiter__"):
+                    async for item in data:
+                        await put(item)
+                else:
+                    for item in data:
+                        await put(item)
+                for _ in range(self.max_workers):
+                    await pending.put(_STOP)
+
+            async def work():
+                while (item := await pending.get()) is not _STOP:
+                    await results.put(await self.single_data_process(item))
+
+            def put_all(batch):
+                for result in batch:
+                    writer.put(result)
+
+            async def forward():
+                stopping = False
+                while not stopping:
+                    batch = [await results.get()]
+                    while not results.empty():
+                        batch.append(results.get_nowait())
+                    if batch[-1] is _STOP:
+                        batch.pop()
+                        stopping = True
+                    # writer.put 在队列已满时阻塞，放到线程中执行，不阻塞事件循环
+                    await asyncio.to_thread(put_all, batch)
+                    p_bar.update(len(batch))
+
+            async def process():
+                forwarder = asyncio.create_task(forward())
+                tasks = [asyncio.create_task(feed())] + [asyncio.create_task(work()) for _ in range(self.max_workers)]
+                try:
+                    await asyncio.gather(*tasks)
+                    await results.put(_STOP)
+                    await forwarder
+                except BaseException:
+                    # 任意一个协程出错时取消其余协程，避免 feed 在队列已满时永远等待
+                    for task in tasks + [forwarder]:
+                        task.cancel()
+                    await asyncio.gather(*tasks, forwarder, return_exceptions=True)
+                    raise
+
+            await self.async_post_init()
+            try:
+                await process()
+            except BaseException:
+                # 已经出错时关闭写入线程，不掩盖原始异常
+                try:
+                    await asyncio.to_thread(writer.close)
+                except RuntimeError:
+                    pass
+                raise
+            else:
+                # close 会等待后台线程写完剩余数据，放到线程中执行
+                await asyncio.to_thread(writer.close)
+            finally:
+                await self.async_close()
+
+    def __call__(self, data: Union[Iterable, AsyncIterable]) -> Any:
+        """同步入口，内部使用 asyncio.run；已经在事件循环中时请使用 await processor.run(data)"""
+        return asyncio.run(self.run(data))
@@ -4,19 +4,86 @@
 # @Author  :   ciaoyizhen
 # @Contact :   yizhen.ciao@gmail.com
 # @Function:   多线程的消费者生产者进程处理
-import json
+import os
 from pathlib import Path
-from concurrent.futures import as_completed, ThreadPoolExecutor
+from functools import partial
+from itertools import islice
+from typing import Any, Iterable, Iterator, List, Literal, Optional, Set, Sized
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
 from ..utils import base_logger
+from ..file.sharded import ShardedWriter, manifest_path, read_manifest
+from ..file.compression import split_compression
+from ..file.background_writer import BackgroundWriter
+from ..file.utils import read_file
+from ..utils.json_codec import get_json_codec
 from tqdm import tqdm
 
+# backend="process" 时每个子进程持有一份处理器实例，由 _init_worker 在子进程中调用 post_init
+_worker_processor = None
+
+
+def _init_worker(processor: "BaseMultiThreading", kwargs: dict) -> None:
+    global _worker_processor
+    processor.post_init(**kwargs)
+    _worker_processor = processor
+
+
+def _process_chunk(items: list) -> list:
+    return [_worker_processor.single_data_process(item) for item in items]
+
+
+def _chunked(data: Iterable, chunk_size: int) -> Iterator[list]:
+    iterator = iter(data)
+    while chunk := list(islice(iterator, chunk_size)):
+        yield chunk
+
+
+def _repair_tail(file_name: Path, encoding: str = "utf-8", block_size: int = 1 << 16) -> None:
+    """
+    修复 continue_save 时已有输出的末尾，避免续写的数据与最后一行拼接成无法解析的行：
+    - 最后一行是完整的 json 但缺少换行符时补上换行符
+    - 最后一行是进程中断时只写了一半的数据时，截断到最后一个换行符之后
+    """
+    with open(file_name, "rb+") as f:
+        size = f.seek(0, os.SEEK_END)
+        end = size
+        # 从文件末尾按块向前查找换行符，只读取末尾的一小段
+        while end > 0:
+            start = max(0, end - block_size)
+            f.seek(start)
+            pos = f.read(end - start).rfind(b"\n")
+            if pos != -1:
+                end = start + pos + 1
+                break
+            end = start
+        if end == size:
+            return
+        f.seek(end)
+        tail = f.read()
+        if tail.strip():
+            try:
+                get_json_codec().loads(tail.decode(encoding))
+            except ValueError:
+                f.truncate(end)
+                base_logger.warning(f"{file_name} 末尾存在不完整的行，已截断 {size - end} 字节")
+                return
+        f.seek(size)
+        f.write(b"\n")
+
+
+def _has_key(key: str, item: Any) -> bool:
+    """resume_key 扫描时的过滤条件，模块顶层函数可以被 pickle 到解析子进程"""
+    return isinstance(item, dict) and key in item
 
 
 class BaseMultiThreading():
     """
     基类, 实现多线程的消费者生产者的处理, 实现边处理边存储
     """
-    def __init__(self, max_workers:int, save_path: str|Path=None, *, file_type:str|Path=None, continue_save: bool=False, **kwargs):
+    def __init__(self, max_workers:int, save_path: str|Path=None, *, file_type:str|Path=None, continue_save: bool=False, shard_rows: int=None, shard_bytes: int=None, max_in_flight: int=None,
+                 flush_every: int=1000, flush_interval: float=1.0, fsync: bool=False,
+                 backend: Literal["thread", "process"]="thread", chunk_size: int=64,
+                 resume_key: str=None, resume_workers: int=None, **kwargs):
         """_summary_
 
         Args:
@@ -24,7 +91,22 @@ class BaseMultiThreading():
             single_file_size (int): 临时存储时，单个文件的大小
             save_path (str|Path): 最终完整保存的文件
             file_type (str|Path): 文件存储类型
-            continue_save (bool): 是否接着之前的存储文件进行存储
+            continue_save (bool): 是否接着之前的存储文件进行存储，分片写入时根据 manifest 接着写入
+            shard_rows (int): 指定后分片写入，每个分片的最大行数，见 ShardedWriter
+            shard_bytes (int): 指定后分片写入，每个分片的最大字节数
+            max_in_flight (int): 同时提交的最大数据条数，默认为 max_workers 的 2 倍（process 时再乘以 chunk_size）。
+                达到上限后等待任务完成并写入结果再继续读取输入，内存占用与输入条数无关
+            flush_every (int): 结果由后台写入线程批量序列化与写入，累计多少条后 flush，1 表示每条都 flush
+            flush_interval (float): 距离上次 flush 超过多少秒后 flush，None 表示只按条数 flush
+            fsync (bool): flush 后是否调用 os.fsync，保证进程崩溃或断电时已 flush 的数据不丢失
+            backend (str): `thread` 使用线程池；`process` 使用进程池，适合分词、正则清洗等 CPU 密集的处理。
+                process 时 post_init 不在主进程执行，而是在每个子进程启动时执行一次，适合加载模型等重资源；
+                子类需要定义在模块顶层，实例与 post_init 之前设置的属性需要可被 pickle。结果仍由主进程统一写入
+            chunk_size (int): process 时每个任务包含的数据条数，用于摊薄进程间通信的开销
+            resume_key (str): 配合 continue_save 使用，按该字段跳过已经处理过的数据。开始处理前并发扫描已有的输出
+                （分片写入时扫描所有分片），只解析该字段构建已完成的集合，输入中该字段的值在集合中的数据不再提交。
+                输入与输出的数据都需要包含该字段
+            resume_workers (int): 扫描已有输出的并发数，单个文件时为按字节段并行解析的进程数，分片写入时为同时读取的分片数
         """
         self.max_workers = max_workers
         self.save_path = Path(save_path)
@@ -33,13 +115,32 @@ class BaseMultiThreading():
         if self.file_type is None:
             self.file_type = self.save_path.suffix.lstrip(".")
 
-        if self.file_type not in {"json", "jsonl", "xlsx", "csv"}:
+        if self.file_type not in {"json", "jsonl", "xlsx", "csv", "parquet", "arrow", "feather"}:
             raise RuntimeError(f"传入的file_type不符合要求或你的文件后缀不符合要求")
         if self.file_type != "jsonl":
             raise ValueError(f"抱歉，目前{self.file_type=}暂时不支持该功能，请使用jsonl")
         self.save_path.parent.mkdir(exist_ok=True, parents=True)
         self.file_mode = "a" if continue_save else "w"
-        self.post_init(**kwargs)
+        self.continue_save = continue_save
+        self.shard_rows = shard_rows
+        self.shard_bytes = shard_bytes
+        if resume_key is not None and not continue_save:
+            raise RuntimeError("使用 resume_key 时必须指定 continue_save=True")
+        self.resume_key = resume_key
+        self.resume_workers = resume_workers
+        if backend not in ("thread", "process"):
+            raise RuntimeError(f"backend 参数错误: {backend}。仅允许 `thread`, `process`")
+        self.backend = backend
+        self.chunk_size = chunk_size if backend == "process" else 1
+        self.max_in_flight = max_in_flight or max_workers * 2 * self.chunk_size
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        if backend == "process":
+            # 重资源在每个子进程中加载，主进程不需要
+            self._post_init_kwargs = kwargs
+        else:
+            self.post_init(**kwargs)
 
     def post_init(self, **kwargs):
         pass
@@ -52,22 +153,102 @@ class BaseMultiThreading():
         raise NotImplementedError(f"未实现函数 single_data_process, 该函数需要解决每个数据要怎么")
 
 
-    def __call__(self, data:list):
-        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="线程处理数据") as exec, \
-            tqdm(total=len(data), desc=f"{self.max_workers}并发处理中") as p_bar, \
-            open(self.save_path, self.file_mode, encoding="utf-8") as f:
+    def _open_output(self):
+        """打开输出文件，指定了 shard_rows/shard_bytes 时使用分片写入"""
+        if self.shard_rows is not None or self.shard_bytes is not None:
+            return ShardedWriter(self.save_path, shard_rows=self.shard_rows, shard_bytes=self.shard_bytes, resume=self.continue_save)
+        return open(self.save_path, self.file_mode, encoding="utf-8")
+
+    def _existing_outputs(self) -> List[Path]:
+        """continue_save 时已有的输出文件，分片写入时为 manifest 中的所有分片"""
+        if self.shard_rows is not None or self.shard_bytes is not None:
+            manifest = manifest_path(self.save_path)
+            files = read_manifest(manifest) if manifest.exists() else []
+        else:
+            files = [self.save_path]
+        return [file for file in files if file.exists()]
+
+    def _prepare_resume(self) -> Optional[Set]:
+        """
+        continue_save 时修复已有输出的末尾；指定了 resume_key 时返回已经处理过的 key 集合
+        输出中为 null 或缺少 resume_key 的行不计入集合
+        """
+        if not self.continue_save:
+            return None
+        files = self._existing_outputs()
+        for file in files:
+            # 压缩文件无法按原始字节判断最后一行，交给解压读取处理
+            if split_compression(file)[1] is None:
+                _repair_tail(file)
+        if self.resume_key is None:
+            return None
+        if not files:
+            return set()
+        # 单个文件时直接传入路径，由 num_workers 按字节段并行解析；多个分片时并发读取各个分片
+        done = read_file(files[0] if len(files) == 1 else files, output_type="set", main_key_column=self.resume_key,
+                         columns=[self.resume_key], where=partial(_has_key, self.resume_key),
+                         num_workers=self.resume_workers, disable_tqdm=True)
+        base_logger.info(f"已有输出中包含 {len(done)} 条已处理的数据，将跳过这些数据")
+        return done
+
+    def _is_done(self, item: Any, done: Optional[Set]) -> bool:
+        if done is None:
+            return False
+        if not isinstance(item, dict) or self.resume_key not in item:
+            raise RuntimeError(f"数据缺少 resume_key='{self.resume_key}'\n数据内容: {item}")
+        return item[self.resume_key] in done
+
+    def _make_executor(self):
+        if self.backend == "process":
+            return ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker, initargs=(self, self._post_init_kwargs))
+        return ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="线程处理数据")
+
+    def __call__(self, data: Iterable):
+        """
+        data 可以是 list，也可以是生成器等任意可迭代对象（如 iter_file 的返回值），
+        输入按需读取，在途任务不超过 max_in_flight，每个结果写入后立即释放
+        """
+        total = len(data) if isinstance(data, Sized) else None
+        chunked = self.backend == "process"
+        done_keys = self._prepare_resume()
+        with self._make_executor() as exec, \
+            tqdm(total=total, desc=f"{self.max_workers}并发处理中") as p_bar, \
+            self._open_output() as f, \
+            BackgroundWriter(f, flush_every=self.flush_every, flush_interval=self.flush_interval, fsync=self.fsync) as writer:
             try:
-                futures_list = []
-                for item in data:
-                    future = exec.submit(self.single_data_process, item)
-                    future.add_done_callback(lambda x: p_bar.update(1))
-                    futures_list.append(future)
-
-                for future in as_completed(futures_list):
-                    result = future.result()
-                    result = json.dumps(result, ensure_ascii=False, default=str)
-                    f.write(result + "\n")
-                    f.flush()
+                if done_keys is not None:
+                    def skip_done(data: Iterable) -> Iterator:
+                        for item in data:
+                            if self._is_done(item, done_keys):
+                                # 跳过的数据也计入进度条
+                                p_bar.update(1)
+                                continue
+                            yield item
+                    data = skip_done(data)
+
+                def write_done(in_flight: set) -> set:
+                    """等待至少一个任务完成，将结果交给后台写入线程，返回仍在运行的任务"""
+                    done, pending = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        results = future.result() if chunked else [future.result()]
+                        for result in results:
+                            writer.put(result)
+                        p_bar.update(len(results))
+                    return pending
+
+                # process 时按 chunk 提交，摊薄每条数据的进程间通信开销
+                if chunked:
+                    tasks = ((_process_chunk, chunk) for chunk in _chunked(data, self.chunk_size))
+                else:
+                    tasks = ((self.single_data_process, item) for item in data)
+                max_tasks = max(1, self.max_in_flight // self.chunk_size)
+                in_flight = set()
+                for fn, arg in tasks:
+                    if len(in_flight) >= max_tasks:
+                        in_flight = write_done(in_flight)
+                    in_flight.add(exec.submit(fn, arg))
+                while in_flight:
+                    in_flight = write_done(in_flight)
             except NotImplementedError:
                 raise
             except KeyboardInterrupt:
@@ -1,2 +1,3 @@
 from .utils import singleton
-from .log_manage import LoggerManager, base_logger
\ No newline at end of file
+from .log_manage import LoggerManager, base_logger
+from .json_codec import set_json_backend, get_json_backend, register_json_backend, JsonCodec
@@ -0,0 +1,137 @@
+# -*- encoding: utf-8 -*-
+# @Time    :   2026/10/17 10:12:05
+# @File    :   json_codec.py
+# @Author  :   ciaoyizhen
+# @Contact :   yizhen.ciao@gmail.com
+# @Function:   可切换的 json 编解码后端(json/orjson/msgspec)
+import json
+from typing import Any, Callable, Dict, NamedTuple, Optional
+from .log_manage import base_logger
+
+
+class JsonCodec(NamedTuple):
+    """
+    一组 json 编解码函数
+    loads(str|bytes) -> Any
+    dumps(obj, ensure_ascii) -> str，对无法序列化的对象：float 的子类输出为数字，其余等价于 default=str
+    """
+    name: str
+    loads: Callable[[Any], Any]
+    dumps: Callable[..., str]
+
+
+def _default(obj: Any) -> Any:
+    """
+    无法原生序列化的对象：float 的子类（如 np.float64）输出为数字，其余转为字符串
+    标准库会把 float 的子类直接当作数字输出，orjson/msgspec 则交给 default 处理，这里保持三者一致
+    """
+    if isinstance(obj, float):
+        return float(obj)
+    return str(obj)
+
+
+def _stdlib_codec() -> JsonCodec:
+    def dumps(obj: Any, ensure_ascii: bool = False) -> str:
+        return json.dumps(obj, ensure_ascii=ensure_ascii, default=_default)
+    return JsonCodec("json", json.loads, dumps)
+
+
+def _orjson_codec() -> JsonCodec:
+    import orjson
+
+    # 与标准库保持一致：非 str 的 key 转为字符串，datetime/dataclass 交给 default 处理
+    option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+
+    def dumps(obj: Any, ensure_ascii: bool = False) -> str:
+        # orjson 只输出 UTF-8，需要转义非 ASCII 字符时回退标准库
+        if ensure_ascii:
+            return json.dumps(obj, ensure_ascii=True, default=_default)
+        try:
+            return orjson.dumps(obj, default=_default, option=option).decode()
+        except orjson.JSONEncodeError:
+            # 超过 64 位的整数等 orjson 不支持的情况
+            return json.dumps(obj, ensure_ascii=False, default=_default)
+    return JsonCodec("orjson", orjson.loads, dumps)
+
+
+def _msgspec_codec() -> JsonCodec:
+    import msgspec
+
+    encoder = msgspec.json.Encoder(enc_hook=_default)
+    decoder = msgspec.json.Decoder()
+
+    def dumps(obj: Any, ensure_ascii: bool = False) -> str:
+        if ensure_ascii:
+            return json.dumps(obj, ensure_ascii=True, default=_default)
+        try:
+            return encoder.encode(obj).decode()
+        except (TypeError, msgspec.EncodeError):
+            return json.dumps(obj, ensure_ascii=False, default=_default)
+    return JsonCodec("msgspec", decoder.decode, dumps)
+
+
+_BACKEND_FACTORIES: Dict[str, Callable[[], JsonCodec]] = {
+    "json": _stdlib_codec,
+    "orjson": _orjson_codec,
+    "msgspec": _msgspec_codec,
+}
+_codecs: Dict[str, JsonCodec] = {}
+_current_backend = "json"
+
+
+def register_json_backend(name: str, factory: Callable[[], JsonCodec]) -> None:
+    """注册自定义后端，factory 在首次使用时调用，缺少依赖时应抛出 ImportError"""
+    _BACKEND_FACTORIES[name] = factory
+    _codecs.pop(name, None)
+
+
+def get_json_codec(name: Optional[str] = None) -> JsonCodec:
+    """
+    获取指定后端的编解码器，name 为 None 时返回当前全局后端
+    依赖未安装时回退为标准库
+    """
+    name = name or _current_backend
+    if name in _codecs:
+        return _codecs[name]
+    if name not in _BACKEND_FACTORIES:
+        raise RuntimeError(f"不支持的 json 后端: {name}。仅允许 {list(_BACKEND_FACTORIES)}")
+    try:
+        codec = _BACKEND_FACTORIES[name]()
+    except ImportError:
+        base_logger.warning(f"未安装 {name}，json 后端回退为标准库 json")
+        codec = _BACKEND_FACTORIES["json"]()
+    _codecs[name] = codec
+    return codec
+
+
+def set_json_backend(name: str) -> str:
+    """
+    设置全局 json 后端，read_file/save_file/return_to_jsonl/BaseMultiThreading 共用
+
+    注意：orjson/msgspec 会将 NaN 输出为 null，msgspec 会将 datetime 输出为 ISO 格式、将 set 输出为数组
+
+    Args:
+        name (str): `json`, `orjson`, `msgspec` 或通过 register_json_backend 注册的名字
+
+    Returns:
+        str: 实际生效的后端名（依赖缺失时为 `json`）
+    """
+    global _current_backend
+    codec = get_json_codec(name)
+    _current_backend = name
+    return codec.name
+
+
+def get_json_backend() -> str:
+    """返回当前实际生效的 json 后端名"""
+    return get_json_codec().name
+
+
+def json_loads(s: Any) -> Any:
+    """使用当前后端解析 str/bytes"""
+    return get_json_codec().loads(s)
+
+
+def json_dumps(obj: Any, ensure_ascii: bool = False) -> str:
+    """使用当前后端序列化为 str，行为等价于 json.dumps(obj, ensure_ascii=..., default=str)，float 的子类输出为数字"""
+    return get_json_codec().dumps(obj, ensure_ascii)
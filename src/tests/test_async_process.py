@@ -0,0 +1,168 @@
+import json
+import time
+import asyncio
+import pytest
+from bedrockx.process import BaseAsyncProcessing
+from bedrockx.file import read_file
+
+
+class EchoClient(BaseAsyncProcessing):
+    """通过 TCP 把数据发给本地 stub 服务，返回服务端的响应"""
+
+    def post_init(self, port=None, **kwargs):
+        self.port = port
+
+    async def single_data_process(self, item):
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        writer.write((json.dumps(item) + "\n").encode())
+        await writer.drain()
+        response = json.loads(await reader.readline())
+        writer.close()
+        await writer.wait_closed()
+        return response
+
+
+async def _serve(handler_delay=0.0, state=None):
+    """启动 asyncio stub 服务：读取一行 json，加上 processed 字段后返回"""
+    async def handle(reader, writer):
+        if state is not None:
+            state["running"] += 1
+            state["peak"] = max(state["peak"], state["running"])
+        item = json.loads(await reader.readline())
+        await asyncio.sleep(handler_delay)
+        writer.write((json.dumps({**item, "processed": True}) + "\n").encode())
+        await writer.drain()
+        writer.close()
+        if state is not None:
+            state["running"] -= 1
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0, backlog=1024)
+    return server, server.sockets[0].getsockname()[1]
+
+
+class TestAsyncProcessing:
+    """测试 BaseAsyncProcessing"""
+
+    def test_against_stub_server(self, temp_dir):
+        """测试高并发请求本地 stub 服务，并发数达到 max_workers"""
+        state = {"running": 0, "peak": 0}
+        save_path = temp_dir / "output.jsonl"
+
+        async def main():
+            server, port = await _serve(handler_delay=0.05, state=state)
+            async with server:
+                await EchoClient(max_workers=200, save_path=save_path, port=port).run([{"id": i} for i in range(400)])
+
+        asyncio.run(main())
+        result = read_file(save_path)
+        assert sorted(item["id"] for item in result) == list(range(400))
+        assert all(item["processed"] for item in result)
+        assert state["peak"] > 100
+
+    def test_sync_call_generator_and_continue_save(self, temp_dir):
+        """测试同步入口、生成器输入与 continue_save"""
+        class Doubler(BaseAsyncProcessing):
+            async def single_data_process(self, item):
+                await asyncio.sleep(0)
+                return {"id": item["id"], "double": item["id"] * 2}
+
+        save_path = temp_dir / "output.jsonl"
+        Doubler(max_workers=10, save_path=save_path)({"id": i} for i in range(50))
+        Doubler(max_workers=10, save_path=save_path, continue_save=True)([{"id": 50}])
+        result = read_file(save_path)
+        assert sorted(item["double"] for item in result) == [i * 2 for i in range(51)]
+
+    def test_resume_key(self, temp_dir):
+        """测试 resume_key 跳过已处理的数据"""
+        processed = []
+
+        class Doubler(BaseAsyncProcessing):
+            async def single_data_process(self, item):
+                processed.append(item["id"])
+                return {"id": item["id"], "double": item["id"] * 2}
+
+        save_path = temp_dir / "output.jsonl"
+        save_path.write_text("".join(f'{{"id": {i}, "double": {i * 2}}}\n' for i in range(30)) + '{"id"', encoding="utf-8")
+        Doubler(max_workers=10, save_path=save_path, continue_save=True, resume_key="id")({"id": i} for i in range(40))
+        assert sorted(processed) == list(range(30, 40))
+        assert sorted(item["id"] for item in read_file(save_path)) == list(range(40))
+
+    def test_async_iterable_and_hooks(self, temp_dir):
+        """测试异步生成器输入与 async_post_init/async_close"""
+        events = []
+
+        class Hooked(BaseAsyncProcessing):
+            async def async_post_init(self):
+                events.append("start")
+
+            async def async_close(self):
+                events.append("close")
+
+            async def single_data_process(self, item):
+                return item
+
+        async def agen():
+            for i in range(5):
+                await asyncio.sleep(0)
+                yield {"id": i}
+
+        save_path = temp_dir / "output.jsonl"
+        Hooked(max_workers=3, save_path=save_path, shard_rows=2)(agen())
+        assert events == ["start", "close"]
+        assert sorted(item["id"] for item in read_file(temp_dir / "output_manifest.json")) == list(range(5))
+
+    @pytest.mark.parametrize("max_queue", [2, 10000])
+    def test_slow_writer_does_not_block_loop(self, temp_dir, monkeypatch, max_queue):
+        """测试后台写入跟不上（队列已满）以及关闭时等待写完剩余数据，事件循环仍然可以调度其他协程"""
+        import functools
+        from bedrockx.file.background_writer import BackgroundWriter
+        from bedrockx.process import async_process
+
+        original_write = BackgroundWriter._write
+
+        def slow_write(self, lines):
+            time.sleep(0.005)
+            original_write(self, lines)
+
+        monkeypatch.setattr(BackgroundWriter, "_write", slow_write)
+        monkeypatch.setattr(async_process, "BackgroundWriter", functools.partial(BackgroundWriter, max_queue=max_queue, batch_size=1))
+
+        class Echo(BaseAsyncProcessing):
+            async def single_data_process(self, item):
+                return item
+
+        async def main():
+            ticks = 0
+            stop = asyncio.Event()
+
+            async def heartbeat():
+                nonlocal ticks
+                while not stop.is_set():
+                    ticks += 1
+                    await asyncio.sleep(0.001)
+
+            task = asyncio.create_task(heartbeat())
+            await Echo(max_workers=4, save_path=temp_dir / "output.jsonl").run([{"id": i} for i in range(40)])
+            stop.set()
+            await task
+            return ticks
+
+        assert asyncio.run(main()) > 20
+        assert sorted(item["id"] for item in read_file(temp_dir / "output.jsonl")) == list(range(40))
+
+    def test_error_propagates(self, temp_dir):
+        """测试处理出错时异常抛给调用方，其余协程被取消"""
+        class Failing(BaseAsyncProcessing):
+            async def single_data_process(self, item):
+                if item["id"] == 3:
+                    raise ValueError("处理失败")
+                await asyncio.sleep(0.01)
+                return item
+
+        with pytest.raises(ValueError, match="处理失败"):
+            Failing(max_workers=2, save_path=temp_dir / "output.jsonl", max_in_flight=2)([{"id": i} for i in range(1000)])
+
+    def test_not_implemented(self, temp_dir):
+        """测试未实现 single_data_process"""
+        with pytest.raises(NotImplementedError):
+            BaseAsyncProcessing(max_workers=2, save_path=temp_dir / "output.jsonl")([{"id": 1}])
@@ -0,0 +1,91 @@
+import io
+import os
+import time
+import pytest
+from bedrockx.file import BackgroundWriter, ShardedWriter, read_file
+from bedrockx.process import BaseMultiThreading
+
+
+class _CountingFile(io.StringIO):
+    """记录 write/flush 次数的内存文件"""
+
+    def __init__(self):
+        super().__init__()
+        self.writes = 0
+        self.flushes = 0
+
+    def write(self, s):
+        self.writes += 1
+        return super().write(s)
+
+    def flush(self):
+        self.flushes += 1
+        super().flush()
+
+
+class TestBackgroundWriter:
+    """测试后台批量写入线程"""
+
+    def test_batches_writes_and_flushes(self):
+        """测试批量写入，按条数 flush，关闭时写完剩余数据"""
+        f = _CountingFile()
+        with BackgroundWriter(f, flush_every=100, flush_interval=None) as writer:
+            for i in range(1000):
+                writer.put({"id": i})
+        assert [int(line.split(": ")[1].rstrip("}")) for line in f.getvalue().splitlines()] == list(range(1000))
+        assert writer.written == 1000
+        assert f.writes < 1000
+        assert f.flushes <= 11
+
+    def test_flush_interval(self):
+        """测试空闲时按时间 flush"""
+        f = _CountingFile()
+        with BackgroundWriter(f, flush_every=10 ** 6, flush_interval=0.05) as writer:
+            writer.put({"id": 1})
+            deadline = time.monotonic() + 2
+            while f.flushes == 0 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert f.flushes == 1
+
+    def test_fsync(self, temp_dir, monkeypatch):
+        """测试 fsync 选项"""
+        calls = []
+        monkeypatch.setattr(os, "fsync", lambda fd: calls.append(fd))
+        with open(temp_dir / "out.jsonl", "w", encoding="utf-8") as f, \
+            BackgroundWriter(f, flush_every=1, fsync=True) as writer:
+            writer.put({"id": 1})
+            writer.put({"id": 2})
+        assert len(calls) >= 1
+        assert read_file(temp_dir / "out.jsonl") == [{"id": 1}, {"id": 2}]
+
+    def test_sharded_target(self, temp_dir):
+        """测试写入分片写入器"""
+        with ShardedWriter(temp_dir / "data.jsonl", shard_rows=3) as sharded, BackgroundWriter(sharded) as writer:
+            for i in range(7):
+                writer.put({"id": i})
+        assert read_file(temp_dir / "data_manifest.json") == [{"id": i} for i in range(7)]
+
+    def test_error_surfaces(self):
+        """测试写入线程出错后在调用方抛出"""
+        class BrokenFile(io.StringIO):
+            def write(self, s):
+                raise OSError("磁盘已满")
+
+        writer = BackgroundWriter(BrokenFile(), max_queue=2, batch_size=1)
+        with pytest.raises(RuntimeError, match="后台写入线程出错"):
+            for i in range(100):
+                writer.put({"id": i})
+            writer.close()
+
+    def test_error_surfaces_in_multi_threading(self, temp_dir, monkeypatch):
+        """测试 BaseMultiThreading 中写入出错时调用方收到异常"""
+        class TestProcessor(BaseMultiThreading):
+            def single_data_process(self, item):
+                return item
+
+        def broken_write(self, lines):
+            raise OSError("磁盘已满")
+
+        monkeypatch.setattr(BackgroundWriter, "_write", broken_write)
+        with pytest.raises(RuntimeError, match="磁盘已满"):
+            TestProcessor(max_workers=2, save_path=temp_dir / "out.jsonl")([{"id": i} for i in range(10)])
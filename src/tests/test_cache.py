@@ -0,0 +1,257 @@
+import os
+import threading
+import pytest
+import pandas as pd
+from bedrockx.file import DiskCache, MemoryCache, read_file, save_file
+from bedrockx.file.cache import callable_identity, estimate_size
+
+
+class Scaler:
+    """绑定方法的实例状态需要计入缓存 key"""
+
+    def __init__(self, n):
+        self.n = n
+
+    def scale(self, item):
+        return item["id"] * self.n
+
+
+class Unpicklable:
+    """repr 含内存地址且无法 pickle 的可调用对象"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+
+    def __call__(self, item):
+        return item["id"]
+
+
+@pytest.fixture
+def cache(temp_dir):
+    return DiskCache(temp_dir / "cache")
+
+
+@pytest.fixture
+def source(temp_dir, sample_data):
+    file_path = temp_dir / "data.jsonl"
+    save_file(file_path, sample_data)
+    return file_path
+
+
+class TestDiskCache:
+    """测试 read_file 的磁盘缓存"""
+
+    def test_hit(self, source, cache, sample_data, monkeypatch):
+        """测试第二次读取直接命中缓存，不再解析源文件"""
+        assert read_file(source, cache=cache) == sample_data
+        assert len(list(cache.cache_dir.glob("*.pkl"))) == 1
+
+        import bedrockx.file.utils as utils
+        monkeypatch.setattr(utils, "_iter_jsonl", lambda *args, **kwargs: pytest.fail("不应重新解析"))
+        assert read_file(source, cache=cache) == sample_data
+
+    def test_key_includes_options(self, source, cache):
+        """测试读取参数与 process_fn 不同时分别缓存"""
+        read_file(source, cache=cache)
+        assert read_file(source, cache=cache, output_type="dict", main_key_column="id")[1]["name"] == "Alice"
+        assert read_file(source, cache=cache, process_fn=lambda x: x["id"]) == [1, 2, 3]
+        assert read_file(source, cache=cache, process_fn=lambda x: x["name"]) == ["Alice", "Bob", "Charlie"]
+        assert read_file(source, cache=cache, columns=["id"], data_length=1) == [{"id": 1}]
+        assert len(list(cache.cache_dir.glob("*.pkl"))) == 5
+
+    def test_source_change_invalidates(self, source, cache, sample_data):
+        """测试源文件变化后缓存失效，旧缓存被删除"""
+        read_file(source, cache=cache)
+        save_file(source, sample_data[:1])
+        stat = source.stat()
+        os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        assert read_file(source, cache=cache) == sample_data[:1]
+        assert len(list(cache.cache_dir.glob("*.pkl"))) == 1
+
+    def test_invalidate(self, source, cache):
+        """测试按路径与全部删除缓存"""
+        read_file(source, cache=cache)
+        read_file(source, cache=cache, output_type="set", main_key_column="id")
+        assert cache.invalidate(source) == 2
+        read_file(source, cache=cache)
+        assert cache.invalidate() == 1
+        assert cache.size() == 0
+
+    def test_lru_eviction(self, temp_dir, cache):
+        """测试超过 max_bytes 后淘汰最久未使用的缓存"""
+        files = []
+        for i in range(3):
+            file_path = temp_dir / f"data{i}.jsonl"
+            save_file(file_path, [{"id": j, "text": "x" * 100} for j in range(50)])
+            files.append(file_path)
+
+        read_file(files[0], cache=cache)
+        entry_size = cache.size()
+        small_cache = DiskCache(cache.cache_dir, max_bytes=entry_size * 2 + 10)
+        read_file(files[1], cache=small_cache)
+        # 访问 files[0] 使其成为最近使用
+        for i, entry in enumerate(sorted(cache.cache_dir.glob("*.pkl"), key=lambda p: p.stat().st_mtime_ns)):
+            os.utime(entry, ns=(10 ** 18 + i, 10 ** 18 + i))
+        read_file(files[0], cache=small_cache)
+        read_file(files[2], cache=small_cache)
+
+        remaining = {entry.name.split("-")[0] for entry in cache.cache_dir.glob("*.pkl")}
+        assert remaining == {DiskCache._path_hash(files[0]), DiskCache._path_hash(files[2])}
+
+    def test_dataframe_zero_copy(self, temp_dir, cache):
+        """测试 DataFrame 通过带外 buffer 缓存，加载后仍然可写"""
+        file_path = temp_dir / "data.csv"
+        pd.DataFrame({"a": range(1000), "b": [0.5] * 1000}).to_csv(file_path, index=False)
+        read_file(file_path, cache=cache, output_type="dataframe")
+        df = read_file(file_path, cache=cache, output_type="dataframe")
+        assert df["a"].sum() == sum(range(1000))
+        df.loc[0, "a"] = -1
+        assert read_file(file_path, cache=cache, output_type="dataframe").loc[0, "a"] == 0
+
+    def test_corrupt_entry(self, source, cache, sample_data):
+        """测试缓存文件损坏时重新读取"""
+        read_file(source, cache=cache)
+        entry = next(cache.cache_dir.glob("*.pkl"))
+        entry.write_bytes(b"broken")
+        assert read_file(source, cache=cache) == sample_data
+
+    def test_bound_method_and_callable_object(self, source, cache):
+        """测试不同实例的绑定方法分别缓存，无法生成稳定标识的可调用对象不缓存"""
+        assert read_file(source, process_fn=Scaler(2).scale, cache=cache) == [2, 4, 6]
+        assert read_file(source, process_fn=Scaler(10).scale, cache=cache) == [10, 20, 30]
+        assert read_file(source, process_fn=Scaler(2).scale, cache=cache) == [2, 4, 6]
+        assert len(list(cache.cache_dir.glob("*.pkl"))) == 2
+
+        assert read_file(source, process_fn=Unpicklable(), cache=cache) == [1, 2, 3]
+        assert len(list(cache.cache_dir.glob("*.pkl"))) == 2
+
+    def test_callable_identity(self):
+        """测试函数标识随代码与闭包变量变化"""
+        def make(n):
+            return lambda x: x + n
+        assert callable_identity(make(1)) == callable_identity(make(1))
+        assert callable_identity(make(1)) != callable_identity(make(2))
+        assert callable_identity(lambda x: x + 1) != callable_identity(lambda x: x + 2)
+        assert callable_identity(Scaler(2).scale) == callable_identity(Scaler(2).scale)
+        assert callable_identity(Scaler(2).scale) != callable_identity(Scaler(10).scale)
+        with pytest.raises(RuntimeError, match="稳定的缓存标识"):
+            callable_identity(Unpicklable())
+
+
+class TestMemoryCache:
+    """测试 read_file 的进程内缓存"""
+
+    def test_hit_returns_shared_object(self, source, sample_data):
+        """测试命中时返回同一个对象"""
+        memo = MemoryCache()
+        first = read_file(source, memo=memo)
+        assert first == sample_data
+        assert read_file(source, memo=memo) is first
+        assert read_file(source, memo=memo, output_type="set", main_key_column="id") == {1, 2, 3}
+        assert len(memo) == 2
+
+    def test_stat_revalidation(self, source, sample_data):
+        """测试源文件变化后重新读取"""
+        memo = MemoryCache()
+        first = read_file(source, memo=memo)
+        save_file(source, sample_data[:2])
+        stat = source.stat()
+        os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        second = read_file(source, memo=memo)
+        assert second is not first
+        assert second == sample_data[:2]
+        assert len(memo) == 1
+
+    def test_byte_budget(self, temp_dir, sample_data):
+        """测试超过按结果估算的上限后淘汰最久未使用的结果"""
+        files = []
+        for i in range(3):
+            file_path = temp_dir / f"data{i}.jsonl"
+            save_file(file_path, sample_data)
+            files.append(file_path)
+        memo = MemoryCache(max_bytes=estimate_size(read_file(files[0])) * 2)
+        results = [read_file(file_path, memo=memo) for file_path in files]
+        assert len(memo) == 2
+        assert memo.current_bytes <= memo.max_bytes
+        assert read_file(files[2], memo=memo) is results[2]
+        assert read_file(files[0], memo=memo) is not results[0]
+
+    def test_budget_uses_result_size(self, temp_dir):
+        """测试占用按结果的内存估算，压缩文件的解压结果远大于文件时不会被缓存"""
+        file_path = temp_dir / "data.jsonl.gz"
+        save_file(file_path, [{"id": i, "text": "x" * 100} for i in range(2000)])
+        assert file_path.stat().st_size < 10000
+        memo = MemoryCache(max_bytes=10000)
+        read_file(file_path, memo=memo)
+        assert len(memo) == 0
+
+    def test_file_changed_during_read(self, source):
+        """测试读取过程中源文件变化时，缓存的结果在下次读取时失效，而不是以新的文件状态一直返回"""
+        memo = MemoryCache()
+
+        class State:
+            """repr 不随状态变化，保证两次读取的 process_fn 标识相同"""
+            calls = 0
+
+            def __repr__(self):
+                return "State()"
+
+        state = State()
+
+        def touch_source(item):
+            state.calls += 1
+            if state.calls == 1:
+                stat = source.stat()
+                os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+            return item
+
+        read_file(source, memo=memo, process_fn=touch_source)
+        calls = state.calls
+        read_file(source, memo=memo, process_fn=touch_source)
+        assert state.calls == calls * 2
+        read_file(source, memo=memo, process_fn=touch_source)
+        assert state.calls == calls * 2
+
+    def test_estimate_size(self):
+        """测试内存估算随数据量增长"""
+        small = [{"id": i, "text": "x" * 10} for i in range(100)]
+        large = [{"id": i, "text": "x" * 10} for i in range(10000)]
+        assert estimate_size(large) > estimate_size(small) * 50
+        df = pd.DataFrame(large)
+        assert estimate_size(df) == df.memory_usage(deep=True).sum()
+
+    def test_bound_method_process_fn(self, source):
+        """测试不同实例的绑定方法不会命中彼此的结果，无法生成稳定标识时不缓存"""
+        memo = MemoryCache()
+        assert read_file(source, memo=memo, process_fn=Scaler(2).scale) == [2, 4, 6]
+        assert read_file(source, memo=memo, process_fn=Scaler(10).scale) == [10, 20, 30]
+        assert read_file(source, memo=memo, where=Scaler(0).scale) == []
+        assert len(memo) == 3
+        assert read_file(source, memo=memo, process_fn=Unpicklable()) == [1, 2, 3]
+        assert len(memo) == 3
+
+    def test_invalidate(self, source):
+        """测试按路径删除缓存"""
+        memo = MemoryCache()
+        first = read_file(source, memo=memo)
+        assert memo.invalidate(source) == 1
+        assert read_file(source, memo=memo) is not first
+        assert memo.invalidate() == 1
+        assert memo.current_bytes == 0
+
+    def test_thread_safety(self, source, sample_data):
+        """测试多线程并发读取"""
+        from concurrent.futures import ThreadPoolExecutor
+
+        memo = MemoryCache()
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(lambda _: read_file(source, memo=memo, disable_tqdm=True), range(64)))
+        assert all(result == sample_data for result in results)
+        assert len(memo) == 1
+
+    def test_with_disk_cache(self, source, cache, sample_data):
+        """测试与磁盘缓存同时使用"""
+        memo = MemoryCache()
+        assert read_file(source, memo=memo, cache=cache) == sample_data
+        assert cache.size() > 0
+        assert read_file(source, cache=cache, memo=MemoryCache()) == sample_data
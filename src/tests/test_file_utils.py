@@ -2,7 +2,7 @@ import json
 import pytest
 import pandas as pd
 from pathlib import Path
-from bedrockx.file import read_file, save_file, add_suffix_file, return_to_jsonl, ReadFileExampleCallBack
+from bedrockx.file import read_file, iter_file, save_file, add_suffix_file, return_to_jsonl, ReadFileExampleCallBack
 
 
 class TestReadFile:
@@ -63,6 +63,29 @@ class TestReadFile:
         result_limit = read_file(sample_csv_file, output_type="list", data_length=2)
         assert len(result_limit) == 2
 
+    def test_read_csv_in_chunks(self, sample_csv_file):
+        """测试 csv 分块读取与整块读取结果一致"""
+        result = read_file(sample_csv_file, output_type="dict", main_key_column="id", chunk_size=1)
+        assert list(result) == [1, 2, 3]
+        assert read_file(sample_csv_file, chunk_size=2) == read_file(sample_csv_file)
+        assert len(read_file(sample_csv_file, chunk_size=2, data_length=3)) == 3
+
+    def test_csv_chunk_dtypes(self, temp_dir):
+        """测试分块读取时各块的列类型与第一块一致，无法一致时报错"""
+        path = temp_dir / "types.csv"
+        path.write_text("a,b\n1,x\n2,y\n3,z\n4.5,w\n", encoding="utf-8")
+        assert read_file(path, chunk_size=2, dtype={"a": float}) == read_file(path)
+        with pytest.raises(RuntimeError, match="dtype"):
+            read_file(path, chunk_size=2)
+
+        path.write_text("a,b\n1,x\n2,y\nq,1\n", encoding="utf-8")
+        assert read_file(path, chunk_size=2, dtype=str) == read_file(path, dtype=str)
+        with pytest.raises(RuntimeError, match="dtype"):
+            read_file(path, chunk_size=2)
+
+        path.write_text("a,b\nq,1\n2,y\n3,2\n", encoding="utf-8")
+        assert read_file(path, chunk_size=2) == read_file(path)
+
     # ========================== Excel 多 Sheet 测试 ==========================
     def test_read_xlsx_features(self, sample_xlsx_file):
         """测试 Excel 读取：单 Sheet 与 多 Sheet 合并"""
@@ -93,6 +116,26 @@ class TestReadFile:
         result_all_limit = read_file(sample_xlsx_file, output_type="list", sheet_name="all", data_length=4)
         assert len(result_all_limit) == 4
 
+    def test_read_xlsx_stream_engine(self, sample_xlsx_file):
+        """测试 xlsx_engine='stream' 与 pandas 读取结果一致，且 data_length 跨 sheet 生效"""
+        for sheet_name in (0, "Sheet2", "all"):
+            assert read_file(sample_xlsx_file, xlsx_engine="stream", sheet_name=sheet_name) == read_file(sample_xlsx_file, sheet_name=sheet_name)
+
+        result = read_file(sample_xlsx_file, xlsx_engine="stream", sheet_name="all", data_length=4)
+        assert [item["id"] for item in result] == [1, 2, 3, 101]
+
+    def test_read_xlsx_stream_duplicate_header(self, temp_dir):
+        """测试 stream 读取时重复列名与 pandas 一样重命名为 a, a.1"""
+        openpyxl = pytest.importorskip("openpyxl")
+        path = temp_dir / "dup.xlsx"
+        for header in (["a", "a", "b", "a.1", "a"], ["Unnamed: 1", None, "x", None, "x"]):
+            workbook = openpyxl.Workbook()
+            for row in (header, [1, 2, 3, 4, 5]):
+                workbook.active.append(row)
+            workbook.save(path)
+            assert read_file(path, xlsx_engine="stream") == pd.read_excel(path).to_dict(orient="records")
+        assert read_file(path, xlsx_engine="stream") == [{"Unnamed: 1": 1, "Unnamed: 1.1": 2, "x": 3, "Unnamed: 3": 4, "x.1": 5}]
+
     # ========================== 异常与边界测试 ==========================
     def test_read_with_path_object(self, sample_jsonl_file):
         """测试使用 Path 对象读取"""
@@ -216,6 +259,453 @@ class TestReadFileCallbacks:
         )
         assert result == [101, 102, 103]
 
+class TestJsonlProgress:
+    """测试 jsonl 进度条模式"""
+
+    def test_single_pass_by_default(self, sample_jsonl_file, monkeypatch):
+        """测试默认按字节显示进度，不再预先统计行数"""
+        from bedrockx.file import utils
+        monkeypatch.setattr(utils, "_get_line_count", lambda path: pytest.fail("不应预先统计行数"))
+        assert len(read_file(sample_jsonl_file)) == 3
+
+    def test_count_lines_opt_in(self, sample_jsonl_file, monkeypatch):
+        """测试 count_lines=True 时先统计行数"""
+        from bedrockx.file import utils
+        calls = []
+        monkeypatch.setattr(utils, "_get_line_count", lambda path: calls.append(path) or 3)
+        assert len(read_file(sample_jsonl_file, count_lines=True)) == 3
+        assert calls == [sample_jsonl_file]
+
+
+class TestColumnProjection:
+    """测试 columns 字段投影"""
+
+    def test_projection_all_formats(self, sample_jsonl_file, sample_json_file, sample_csv_file, sample_xlsx_file):
+        """测试各格式只返回指定字段"""
+        expected = [{"id": 1, "name": "Alice"}, {"id": 2, "name": "Bob"}, {"id": 3, "name": "Charlie"}]
+        for file_path in (sample_jsonl_file, sample_json_file, sample_csv_file, sample_xlsx_file):
+            assert read_file(file_path, columns=["id", "name"]) == expected
+            assert list(iter_file(file_path, columns=["id", "name"])) == expected
+        assert read_file(sample_xlsx_file, columns=["id", "name"], xlsx_engine="stream") == expected
+        assert read_file(sample_jsonl_file, columns=["id", "name"], num_workers=2) == expected
+
+    def test_projection_before_process_fn(self, sample_jsonl_file):
+        """测试投影在 process_fn 之前生效"""
+        result = read_file(sample_jsonl_file, columns=["name"], process_fn=lambda x: sorted(x))
+        assert result == [["name"]] * 3
+
+    def test_json_projection_nested_values(self, temp_dir):
+        """测试 json 投影保留嵌套结构，跳过未选中的嵌套字段，非对象元素原样返回"""
+        file_path = temp_dir / "nested.json"
+        data = [
+            {"id": 1, "skip": {"a": [1, {"b": 2}]}, "messages": [{"role": "user", "content": "你好"}]},
+            {"messages": {"x": None}, "id": 2},
+            [1, 2],
+            "text",
+        ]
+        file_path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+
+        result = read_file(file_path, columns=["id", "messages"])
+        assert result == [
+            {"id": 1, "messages": [{"role": "user", "content": "你好"}]},
+            {"id": 2, "messages": {"x": None}},
+            [1, 2],
+            "text",
+        ]
+        assert read_file(file_path, columns=["id"], data_length=1) == [{"id": 1}]
+
+
+def _w_positive(item):
+    """模块级函数，where 用到 columns 之外的字段"""
+    return item["w"] > 0
+
+
+class TestFilterWithColumns:
+    """测试 columns 与 where/exclude_keys/dedup_on 同时使用时，过滤在投影之前执行"""
+
+    data = [
+        {"id": 1, "v": "a", "w": 1},
+        {"id": 1, "v": "b", "w": 1},
+        {"id": 2, "v": "c", "w": 0},
+        {"id": 3, "v": "d", "w": 1},
+    ]
+
+    def _sources(self, temp_dir):
+        save_file(temp_dir / "data.jsonl", self.data)
+        save_file(temp_dir / "data.csv", self.data)
+        save_file(temp_dir / "shards" / "data.jsonl", self.data, shard_rows=2)
+        return [
+            (temp_dir / "data.jsonl", {}),
+            (temp_dir / "data.jsonl", {"num_workers": 2}),
+            (temp_dir / "data.csv", {}),
+            (temp_dir / "shards", {}),
+            (temp_dir / "shards", {"data_length": 4}),
+        ]
+
+    def test_each_filter(self, temp_dir):
+        """测试每种过滤条件用到 columns 之外的字段"""
+        cases = [
+            (dict(dedup_on="id"), ["a", "c", "d"]),
+            (dict(exclude_keys={1}, main_key_column="id"), ["c", "d"]),
+            (dict(where=_w_positive), ["a", "b", "d"]),
+        ]
+        for file_path, options in self._sources(temp_dir):
+            for filters, expected in cases:
+                result = read_file(file_path, columns=["v"], disable_tqdm=True, **filters, **options)
+                assert result == [{"v": v} for v in expected], (file_path, options, filters)
+        for filters, expected in cases:
+            assert list(iter_file(temp_dir / "data.jsonl", columns=["v"], **filters)) == [{"v": v} for v in expected]
+
+
+def _is_even_id(item):
+    """模块级函数，供多进程过滤测试使用"""
+    return item["id"] % 2 == 0
+
+
+class TestReadFilePushdown:
+    """测试 where/exclude_keys/dedup_on 在读取循环内过滤"""
+
+    @pytest.fixture
+    def dup_jsonl_file(self, temp_dir):
+        file_path = temp_dir / "dup.jsonl"
+        rows = [{"id": i, "group": i % 3} for i in range(30)]
+        file_path.write_text("\n".join(json.dumps(row) for row in rows), encoding="utf-8")
+        return file_path
+
+    def test_where(self, dup_jsonl_file):
+        """测试 where 谓词"""
+        result = read_file(dup_jsonl_file, where=_is_even_id)
+        assert [item["id"] for item in result] == list(range(0, 30, 2))
+
+    def test_exclude_keys_matches_filter_fn(self, dup_jsonl_file):
+        """测试 exclude_keys 与 filter_fn 结果一致"""
+        from bedrockx.process import filter_fn
+        done_ids = set(range(10))
+        expected = filter_fn(read_file(dup_jsonl_file), done_ids, main_key_column="id")
+        assert read_file(dup_jsonl_file, exclude_keys=done_ids, main_key_column="id") == expected
+        assert list(iter_file(dup_jsonl_file, exclude_keys=done_ids, main_key_column="id")) == expected
+
+    def test_exclude_keys_requires_main_key_column(self, dup_jsonl_file):
+        """测试 exclude_keys 必须指定 main_key_column"""
+        with pytest.raises(RuntimeError, match="必须指定 main_key_column"):
+            read_file(dup_jsonl_file, exclude_keys={1})
+
+    def test_dedup_on_matches_drop_duplicates(self, dup_jsonl_file):
+        """测试 dedup_on 与 drop_duplicates 结果一致，且在 process_fn 之前执行"""
+        from bedrockx.process import drop_duplicates
+        expected = drop_duplicates(read_file(dup_jsonl_file), main_key_column="group")
+        assert read_file(dup_jsonl_file, dedup_on="group") == expected
+        assert read_file(dup_jsonl_file, dedup_on="group", process_fn=lambda x: x["id"]) == [0, 1, 2]
+
+    def test_pushdown_csv(self, sample_csv_file):
+        """测试 csv 同样支持过滤"""
+        result = read_file(sample_csv_file, where=lambda x: x["age"] > 25, exclude_keys={3}, main_key_column="id")
+        assert [item["id"] for item in result] == [2]
+
+    def test_pushdown_parallel(self, dup_jsonl_file):
+        """测试多进程解析时过滤与全局去重"""
+        kwargs = {"where": _is_even_id, "exclude_keys": {0}, "main_key_column": "id", "dedup_on": "group"}
+        assert read_file(dup_jsonl_file, num_workers=3, **kwargs) == read_file(dup_jsonl_file, **kwargs)
+        assert [item["id"] for item in read_file(dup_jsonl_file, **kwargs)] == [2, 4, 6]
+
+
+class TestColumnarOutput:
+    """测试列式输出 columns/dataframe/arrow"""
+
+    def test_columns_from_jsonl(self, temp_dir):
+        """测试 jsonl 读取为列字典，缺失字段补 None"""
+        file_path = temp_dir / "ragged.jsonl"
+        file_path.write_text('{"id": 1, "a": "x"}\n{"id": 2}\n{"id": 3, "b": true}\n', encoding="utf-8")
+        result = read_file(file_path, output_type="columns")
+        assert result == {"id": [1, 2, 3], "a": ["x", None, None], "b": [None, None, True]}
+
+    def test_dataframe(self, sample_jsonl_file, sample_csv_file, sample_xlsx_file, sample_data):
+        """测试各格式读取为 DataFrame"""
+        expected = pd.DataFrame(sample_data)
+        for file_path in (sample_jsonl_file, sample_csv_file, sample_xlsx_file):
+            pd.testing.assert_frame_equal(read_file(file_path, output_type="dataframe"), expected)
+        pd.testing.assert_frame_equal(read_file(sample_xlsx_file, output_type="dataframe", xlsx_engine="stream"), expected)
+
+    def test_dataframe_fast_path_options(self, sample_csv_file, sample_xlsx_file):
+        """测试 csv/xlsx 直接返回 DataFrame 时 data_length/columns/sheet_name 仍然生效"""
+        df = read_file(sample_csv_file, output_type="dataframe", data_length=2, columns=["id"])
+        assert df.to_dict(orient="list") == {"id": [1, 2]}
+        assert read_file(sample_xlsx_file, output_type="columns", sheet_name="all", data_length=4)["id"] == [1, 2, 3, 101]
+
+    def test_dataframe_with_process_fn(self, sample_csv_file):
+        """测试有 process_fn 时逐行处理后再构建列"""
+        df = read_file(sample_csv_file, output_type="dataframe", process_fn=lambda x: {"id": x["id"] * 10})
+        assert df["id"].tolist() == [10, 20, 30]
+
+    def test_arrow(self, sample_jsonl_file, sample_csv_file):
+        """测试读取为 pyarrow.Table"""
+        pa = pytest.importorskip("pyarrow")
+        for file_path in (sample_jsonl_file, sample_csv_file):
+            table = read_file(file_path, output_type="arrow")
+            assert isinstance(table, pa.Table)
+            assert table.column("name").to_pylist() == ["Alice", "Bob", "Charlie"]
+
+    def test_columnar_requires_dict(self, sample_jsonl_file):
+        """测试列式输出要求每条数据为 dict"""
+        with pytest.raises(RuntimeError, match="每条数据必须是 dict"):
+            read_file(sample_jsonl_file, output_type="columns", process_fn=lambda x: x["id"])
+
+
+class TestCompression:
+    """测试压缩文件的透明读写"""
+
+    @pytest.mark.parametrize("suffix", [".gz", ".bz2", ".xz", ".zst"])
+    @pytest.mark.parametrize("file_type", ["jsonl", "json", "csv"])
+    def test_roundtrip(self, temp_dir, sample_data, file_type, suffix):
+        """测试按后缀链压缩写入并解压读取"""
+        if suffix == ".zst":
+            pytest.importorskip("zstandard")
+        file_path = temp_dir / f"output.{file_type}{suffix}"
+        save_file(file_path, sample_data)
+
+        assert file_path.exists()
+        assert read_file(file_path) == sample_data
+        assert list(iter_file(file_path)) == sample_data
+        assert read_file(file_path, data_length=2) == sample_data[:2]
+
+    def test_compressed_is_smaller(self, temp_dir):
+        """测试确实写入了压缩数据"""
+        data = [{"id": i, "text": "重复的文本" * 20} for i in range(200)]
+        save_file(temp_dir / "plain.jsonl", data)
+        save_file(temp_dir / "packed.jsonl.gz", data)
+        assert (temp_dir / "packed.jsonl.gz").stat().st_size < (temp_dir / "plain.jsonl").stat().st_size / 5
+
+    def test_threaded_gzip(self, temp_dir, sample_data):
+        """测试多线程压缩/解压（未安装 python-isal 时回退标准库）"""
+        file_path = temp_dir / "threads.jsonl.gz"
+        save_file(file_path, sample_data, compression_threads=2)
+        assert read_file(file_path, compression_threads=2) == sample_data
+
+    def test_num_workers_falls_back(self, temp_dir, sample_data):
+        """测试压缩文件忽略 num_workers"""
+        file_path = temp_dir / "parallel.jsonl.gz"
+        save_file(file_path, sample_data)
+        assert read_file(file_path, num_workers=2) == sample_data
+
+    def test_compressed_xlsx_not_supported(self, temp_dir, sample_data):
+        """测试不支持压缩的 xlsx"""
+        with pytest.raises(RuntimeError, match="不支持保存压缩的 xlsx"):
+            save_file(temp_dir / "output.xlsx.gz", sample_data)
+
+
+class TestArrowFormats:
+    """测试 parquet/arrow(feather) 读写"""
+
+    @pytest.fixture
+    def parquet_file(self, temp_dir):
+        pytest.importorskip("pyarrow")
+        data = [{"id": i, "name": f"名字{i}", "score": i * 0.5} for i in range(100)]
+        file_path = temp_dir / "data.parquet"
+        save_file(file_path, data, row_group_size=30)
+        return file_path
+
+    @pytest.mark.parametrize("suffix", [".parquet", ".arrow", ".feather"])
+    def test_roundtrip(self, temp_dir, sample_data, suffix):
+        """测试保存后读取结果一致"""
+        pytest.importorskip("pyarrow")
+        file_path = temp_dir / f"output{suffix}"
+        save_file(file_path, sample_data)
+
+        assert read_file(file_path) == sample_data
+        assert list(iter_file(file_path)) == sample_data
+        assert read_file(file_path, data_length=2, columns=["id"]) == [{"id": 1}, {"id": 2}]
+        assert read_file(file_path, output_type="dict", main_key_column="id")[3] == sample_data[2]
+
+    def test_row_group_data_length(self, parquet_file):
+        """测试 data_length 只读取需要的 row group"""
+        import pyarrow.parquet as pq
+        from bedrockx.file.utils import _parquet_row_groups
+
+        parquet_file_obj = pq.ParquetFile(parquet_file)
+        assert parquet_file_obj.num_row_groups == 4
+        assert _parquet_row_groups(parquet_file_obj, 45) == [0, 1]
+        assert _parquet_row_groups(parquet_file_obj, 30) == [0]
+
+        result = read_file(parquet_file, data_length=45, chunk_size=7)
+        assert [item["id"] for item in result] == list(range(45))
+
+    def test_columnar_output(self, parquet_file):
+        """测试列式输出直接读取为 Table"""
+        import pyarrow as pa
+
+        table = read_file(parquet_file, output_type="arrow", columns=["id", "score"], data_length=50)
+        assert isinstance(table, pa.Table)
+        assert table.column_names == ["id", "score"]
+        assert table.num_rows == 50
+
+        df = read_file(parquet_file, output_type="dataframe")
+        assert list(df["id"]) == list(range(100))
+        assert read_file(parquet_file, output_type="columns", columns=["id"], data_length=3) == {"id": [0, 1, 2]}
+
+    def test_filters_and_process_fn(self, parquet_file):
+        """测试过滤与 process_fn 对 parquet 同样生效"""
+        result = read_file(parquet_file, where=lambda x: x["id"] % 10 == 0, process_fn=lambda x: x["id"])
+        assert result == list(range(0, 100, 10))
+
+    def test_compressed_not_supported(self, temp_dir, sample_data):
+        """测试 parquet 不支持外层压缩后缀"""
+        with pytest.raises(RuntimeError, match="不支持保存压缩的 parquet"):
+            save_file(temp_dir / "output.parquet.gz", sample_data)
+
+    def test_mixed_types_error(self, temp_dir):
+        """测试同一字段类型不一致时给出明确错误"""
+        pytest.importorskip("pyarrow")
+        with pytest.raises(RuntimeError, match="同一字段的类型需要一致"):
+            save_file(temp_dir / "output.parquet", [{"a": 1}, {"a": "x"}])
+
+
+class TestMultiFileInput:
+    """测试 glob/目录/路径列表的多文件读取"""
+
+    @pytest.fixture
+    def shard_dir(self, temp_dir):
+        shard_dir = temp_dir / "shards"
+        shard_dir.mkdir()
+        for part in range(4):
+            data = [{"id": part * 10 + i, "part": part} for i in range(10)]
+            suffix = ".jsonl.gz" if part == 3 else ".jsonl"
+            save_file(shard_dir / f"data_part-{part:05d}{suffix}", data)
+        (shard_dir / "notes.txt").write_text("ignored")
+        return shard_dir
+
+    @pytest.fixture
+    def expected(self):
+        return [{"id": part * 10 + i, "part": part} for part in range(4) for i in range(10)]
+
+    def test_directory(self, shard_dir, expected):
+        """测试读取目录，按文件名顺序合并，跳过不支持的文件"""
+        assert read_file(shard_dir) == expected
+
+    def test_glob(self, shard_dir, expected):
+        """测试 glob 表达式"""
+        assert read_file(str(shard_dir / "*.jsonl*")) == expected
+        assert read_file(str(shard_dir / "*.jsonl")) == expected[:30]
+        assert read_file(str(shard_dir.parent / "**" / "*.jsonl.gz")) == expected[30:]
+
+    def test_path_list(self, shard_dir, expected):
+        """测试路径列表保持给定顺序"""
+        paths = [shard_dir / "data_part-00001.jsonl", shard_dir / "data_part-00000.jsonl"]
+        assert read_file(paths) == expected[10:20] + expected[:10]
+
+    @pytest.mark.parametrize("shard_executor", ["thread", "process"])
+    def test_executor_and_unordered(self, shard_dir, expected, shard_executor):
+        """测试线程池/进程池读取与按完成顺序合并"""
+        assert read_file(shard_dir, num_workers=2, shard_executor=shard_executor) == expected
+        result = read_file(shard_dir, num_workers=2, ordered=False, shard_executor=shard_executor)
+        assert sorted(result, key=lambda x: x["id"]) == expected
+
+    def test_global_data_length(self, shard_dir, expected):
+        """测试 data_length 跨分片计数"""
+        assert read_file(shard_dir, data_length=25) == expected[:25]
+
+    def test_filters_and_global_dedup(self, shard_dir):
+        """测试过滤在分片内执行，去重跨分片生效"""
+        result = read_file(shard_dir, dedup_on="part", where=lambda x: x["id"] % 10 > 4, output_type="dict", main_key_column="part")
+        assert list(result) == [0, 1, 2, 3]
+        assert [item["id"] for item in result.values()] == [5, 15, 25, 35]
+
+    def test_empty_expansion(self, temp_dir):
+        """测试 glob、目录、manifest 展开为空时与不存在的文件一样报错"""
+        with pytest.raises(FileNotFoundError):
+            read_file(str(temp_dir / "*.jsonl"))
+        with pytest.raises(FileNotFoundError):
+            read_file(str(temp_dir / "missing[1].jsonl"))
+        with pytest.raises(FileNotFoundError):
+            read_file(temp_dir)
+        (temp_dir / "data_manifest.json").write_text(json.dumps({"format": "jsonl", "shards": []}), encoding="utf-8")
+        with pytest.raises(FileNotFoundError):
+            read_file(temp_dir / "data_manifest.json")
+
+
+class TestParallelJsonl:
+    """测试 jsonl 多进程解析"""
+
+    @pytest.fixture
+    def large_jsonl_file(self, temp_dir):
+        file_path = temp_dir / "large.jsonl"
+        with open(file_path, "w", encoding="utf-8") as f:
+            for i in range(1000):
+                f.write(json.dumps({"id": i, "name": f"名字{i}" * (i % 7)}, ensure_ascii=False) + "\n")
+                if i % 100 == 0:
+                    f.write("\n")  # 空行应被跳过
+        return file_path
+
+    def test_parallel_ordered(self, large_jsonl_file):
+        """测试多进程解析结果与单进程完全一致"""
+        assert read_file(large_jsonl_file, num_workers=3) == read_file(large_jsonl_file)
+
+    def test_parallel_unordered(self, large_jsonl_file):
+        """测试 ordered=False 时内容一致"""
+        result = read_file(large_jsonl_file, output_type="set", main_key_column="id", num_workers=3, ordered=False)
+        assert result == set(range(1000))
+
+    def test_parallel_process_fn(self, complex_jsonl_file):
+        """测试 process_fn 在子进程中执行"""
+        result = read_file(complex_jsonl_file, num_workers=2, process_fn=ReadFileExampleCallBack.filter_positive_only)
+        assert [item["id"] for item in result] == [101, 103]
+        assert all(item["processed"] for item in result)
+
+    def test_parallel_empty_file(self, temp_dir):
+        """测试空文件"""
+        empty = temp_dir / "empty.jsonl"
+        empty.touch()
+        assert read_file(empty, num_workers=2) == []
+
+
+class TestIterFile:
+    """测试 iter_file 流式读取"""
+
+    def test_iter_jsonl_is_lazy(self, sample_jsonl_file):
+        """测试 iter_file 返回生成器且与 read_file 结果一致"""
+        iterator = iter_file(sample_jsonl_file)
+        assert not isinstance(iterator, list)
+        assert next(iterator)["name"] == "Alice"
+        assert list(iter_file(sample_jsonl_file)) == read_file(sample_jsonl_file)
+
+    def test_iter_data_length_and_process_fn(self, complex_jsonl_file):
+        """测试 data_length 与 process_fn（返回 None 时跳过）"""
+        result = list(iter_file(complex_jsonl_file, data_length=2, process_fn=ReadFileExampleCallBack.filter_positive_only))
+        assert [item["id"] for item in result] == [101]
+
+    def test_iter_json(self, sample_json_file):
+        """测试 json 流式读取"""
+        assert [item["id"] for item in iter_file(sample_json_file, data_length=2)] == [1, 2]
+
+    def test_iter_csv_in_chunks(self, sample_csv_file):
+        """测试 csv 分块读取结果与一次性读取一致"""
+        assert list(iter_file(sample_csv_file, chunk_size=1)) == read_file(sample_csv_file)
+        assert len(list(iter_file(sample_csv_file, chunk_size=1, data_length=2))) == 2
+
+    def test_iter_xlsx(self, sample_xlsx_file):
+        """测试 xlsx 只读模式逐行读取，以及跨 sheet 的 data_length"""
+        assert list(iter_file(sample_xlsx_file)) == read_file(sample_xlsx_file)
+        assert [item["id"] for item in iter_file(sample_xlsx_file, sheet_name="Sheet2")] == [101, 102, 103]
+        result = list(iter_file(sample_xlsx_file, sheet_name="all", data_length=4))
+        assert [item["id"] for item in result] == [1, 2, 3, 101]
+
+    def test_iter_xlsx_nan(self, temp_dir):
+        """测试 xlsx 空值与 na_filter 的语义与 read_file 一致"""
+        excel_file = temp_dir / "nan.xlsx"
+        pd.DataFrame({"name": ["Alice", None], "age": [None, 30]}).to_excel(excel_file, index=False)
+
+        data = list(iter_file(excel_file))
+        assert data[0]["age"] == ""
+        assert data[1]["name"] == ""
+        assert pd.isna(list(iter_file(excel_file, na_filter=True))[1]["name"])
+
+    def test_iter_unsupported(self, temp_dir):
+        """测试不支持的文件格式"""
+        unknown_file = temp_dir / "test.xyz"
+        unknown_file.touch()
+        with pytest.raises(RuntimeError, match="不支持的文件格式"):
+            list(iter_file(unknown_file))
+
+
 class TestSaveFile:
     """测试 save_file 函数"""
     
@@ -313,6 +803,153 @@ class TestSaveFile:
         assert result == []
 
 
+class TestStreamingSave:
+    """测试 save_file 接收生成器并分批写入"""
+
+    @staticmethod
+    def _gen(n):
+        for i in range(n):
+            yield {"id": i, "name": f"名字{i}"}
+
+    @pytest.mark.parametrize("suffix", [".jsonl", ".json", ".csv", ".xlsx", ".parquet", ".arrow", ".jsonl.gz", ".csv.gz"])
+    def test_generator_roundtrip(self, temp_dir, suffix):
+        """测试生成器输入在各格式下与 list 输入结果一致"""
+        if suffix in (".parquet", ".arrow"):
+            pytest.importorskip("pyarrow")
+        file_path = temp_dir / f"output{suffix}"
+        save_file(file_path, self._gen(25), batch_size=10)
+        assert read_file(file_path) == list(self._gen(25))
+
+    def test_generator_as_first_arg(self, temp_dir):
+        """测试生成器作为第一个参数"""
+        file_path = temp_dir / "output.jsonl"
+        save_file(self._gen(3), file_path)
+        assert read_file(file_path) == list(self._gen(3))
+
+    def test_iter_file_pipeline(self, temp_dir):
+        """测试 iter_file -> 处理 -> save_file 的流式管道"""
+        src = temp_dir / "src.jsonl"
+        save_file(src, self._gen(50))
+        dst = temp_dir / "dst.csv"
+        save_file(dst, iter_file(src, where=lambda x: x["id"] % 2 == 0, process_fn=lambda x: {**x, "even": True}), batch_size=7)
+        result = read_file(dst)
+        assert [row["id"] for row in result] == list(range(0, 50, 2))
+        assert all(row["even"] for row in result)
+
+    def test_csv_header_from_first_batch(self, temp_dir):
+        """测试生成器的 csv 表头来自第一个 batch，之后的 batch 按表头对齐"""
+        data = iter([{"a": 1, "b": 2}, {"a": 3}, {"a": 5, "b": 6, "c": 7}])
+        file_path = temp_dir / "output.csv"
+        save_file(file_path, data, batch_size=1)
+        assert file_path.read_text().splitlines() == ["a,b", "1,2", "3,", "5,6"]
+
+    def test_csv_list_header_is_union(self, temp_dir):
+        """测试 list 输入的 csv 表头为所有字段的并集，与 pd.DataFrame 一致"""
+        file_path = temp_dir / "output.csv"
+        save_file(file_path, [{"a": 1}, {"b": 2}], batch_size=1)
+        assert file_path.read_text().splitlines() == ["a,b", "1,", ",2"]
+
+    def test_schema(self, temp_dir):
+        """测试 schema 指定表头与列顺序"""
+        file_path = temp_dir / "output.csv"
+        save_file(file_path, self._gen(2), schema=["name", "id"])
+        assert file_path.read_text(encoding="utf-8").splitlines() == ["name,id", "名字0,0", "名字1,1"]
+
+        empty_path = temp_dir / "empty.csv"
+        save_file(empty_path, iter([]), schema=["id", "name"])
+        assert empty_path.read_text().splitlines() == ["id,name"]
+
+    def test_csv_pd_index_continues(self, temp_dir):
+        """测试分批写入时索引连续"""
+        file_path = temp_dir / "output.csv"
+        save_file(file_path, self._gen(4), batch_size=3, pd_index=True)
+        assert [line.split(",")[0] for line in file_path.read_text(encoding="utf-8").splitlines()[1:]] == ["0", "1", "2", "3"]
+
+    def test_parquet_batches_become_row_groups(self, temp_dir):
+        """测试生成器写入 parquet 时每个 batch 为一个 row group"""
+        pq = pytest.importorskip("pyarrow.parquet")
+        file_path = temp_dir / "output.parquet"
+        save_file(file_path, self._gen(25), batch_size=10)
+        assert pq.ParquetFile(file_path).num_row_groups == 3
+
+    def test_xlsx_stream_nan(self, temp_dir):
+        """测试 xlsx 只写模式下 NaN 写为空单元格"""
+        file_path = temp_dir / "output.xlsx"
+        save_file(file_path, iter([{"id": 1, "score": float("nan")}, {"id": 2, "score": 0.5}]))
+        result = read_file(file_path)
+        assert result == [{"id": 1, "score": ""}, {"id": 2, "score": 0.5}]
+
+
+class TestParallelSave:
+    """测试 jsonl 并行序列化写入"""
+
+    @pytest.mark.parametrize("executor", ["thread", "process"])
+    def test_same_as_serial(self, temp_dir, executor):
+        """测试并行写入的内容与单线程写入完全一致"""
+        data = [{"id": i, "text": f"文本{i}", "tags": [i, str(i)]} for i in range(1000)]
+        serial = temp_dir / "serial.jsonl"
+        parallel = temp_dir / "parallel.jsonl"
+        save_file(serial, data)
+        save_file(parallel, data, num_workers=3, executor=executor, batch_size=64)
+        assert parallel.read_bytes() == serial.read_bytes()
+
+    def test_generator_and_compression(self, temp_dir):
+        """测试生成器输入与压缩输出"""
+        file_path = temp_dir / "parallel.jsonl.gz"
+        save_file(file_path, ({"id": i} for i in range(500)), num_workers=2, batch_size=50)
+        assert read_file(file_path) == [{"id": i} for i in range(500)]
+
+
+class TestJsonArrayWriter:
+    """测试 json 流式数组写入"""
+
+    @pytest.mark.parametrize("data", [
+        [{"a": [1, {"b": 2}], "c": "中文"}, 3, []],
+        {"x": {"y": [1, 2]}, 1: None, "z": []},
+        [],
+        {},
+    ])
+    @pytest.mark.parametrize("json_indent", [4, 2, "\t"])
+    def test_same_as_json_dump(self, temp_dir, data, json_indent):
+        """测试指定缩进时与 json.dump 的输出完全一致"""
+        file_path = temp_dir / "output.json"
+        save_file(file_path, data, json_indent=json_indent, batch_size=1)
+        assert file_path.read_text(encoding="utf-8") == json.dumps(data, ensure_ascii=False, indent=json_indent)
+
+    @pytest.mark.parametrize("data", ["hello", "中文", 5, 1.5, True])
+    @pytest.mark.parametrize("json_indent", ["auto", 4, None])
+    def test_scalar_root(self, temp_dir, data, json_indent):
+        """测试 str 与数字等标量作为根时整体写入，不会被当作可迭代对象拆开"""
+        file_path = temp_dir / "output.json"
+        save_file(file_path, data, json_indent=json_indent)
+        assert json.loads(file_path.read_text(encoding="utf-8")) == data
+
+    def test_compact_one_item_per_line(self, temp_dir, sample_data):
+        """测试紧凑模式每行一条"""
+        file_path = temp_dir / "output.json"
+        save_file(file_path, sample_data, json_indent=None)
+        lines = file_path.read_text(encoding="utf-8").splitlines()
+        assert lines[0] == "[" and lines[-1] == "]"
+        assert len(lines) == len(sample_data) + 2
+        assert read_file(file_path) == sample_data
+
+    def test_auto_indent(self, temp_dir, sample_data):
+        """测试 auto 模式：小数据缩进，大数据与生成器紧凑"""
+        small = temp_dir / "small.json"
+        save_file(small, sample_data)
+        assert small.read_text(encoding="utf-8") == json.dumps(sample_data, ensure_ascii=False, indent=4)
+
+        large_data = [{"id": i} for i in range(10001)]
+        large = temp_dir / "large.json"
+        save_file(large, large_data)
+        assert len(large.read_text(encoding="utf-8").splitlines()) == len(large_data) + 2
+
+        gen = temp_dir / "gen.json"
+        save_file(gen, (item for item in sample_data))
+        assert len(gen.read_text(encoding="utf-8").splitlines()) == len(sample_data) + 2
+        assert read_file(gen) == sample_data
+
+
 class TestAddSuffixFile:
     """测试 add_suffix_file 函数"""
     
@@ -465,6 +1102,7 @@ class TestNaNHandling:
             df2.to_excel(writer, sheet_name="Sheet2", index=False)
 
         data = read_file(excel_file, sheet_name="all")
+        assert read_file(excel_file, sheet_name="all", xlsx_engine="stream") == data
 
         assert len(data) == 6
         assert data[1]["col1"] == ""
@@ -0,0 +1,117 @@
+import os
+import json
+import threading
+import time
+from bedrockx.file import JsonlFollower, follow_file
+
+
+def _append(file_path, text, mode="a"):
+    with open(file_path, mode, encoding="utf-8") as f:
+        f.write(text)
+
+
+def _line(i):
+    return json.dumps({"id": i}) + "\n"
+
+
+class TestJsonlFollower:
+    """测试 jsonl 增量跟随读取"""
+
+    def test_incremental(self, temp_dir):
+        """测试只返回新追加的完整行，偏移随之前进"""
+        file_path = temp_dir / "follow.jsonl"
+        with JsonlFollower(file_path) as follower:
+            assert follower.read_new() == []  # 文件还不存在
+            _append(file_path, _line(0) + _line(1))
+            assert follower.read_new() == [{"id": 0}, {"id": 1}]
+            assert follower.read_new() == []
+            _append(file_path, "\n" + _line(2))
+            assert follower.read_new() == [{"id": 2}]
+            assert follower.offset == file_path.stat().st_size
+
+    def test_partial_line(self, temp_dir):
+        """测试末尾不完整的行留到下次读取"""
+        file_path = temp_dir / "follow.jsonl"
+        _append(file_path, _line(0) + '{"id": ')
+        with JsonlFollower(file_path) as follower:
+            assert follower.read_new() == [{"id": 0}]
+            _append(file_path, "1}")
+            assert follower.read_new() == []
+            _append(file_path, "\n")
+            assert follower.read_new() == [{"id": 1}]
+
+    def test_resume_from_offset_and_from_end(self, temp_dir):
+        """测试从保存的偏移继续读取以及跳过已有数据"""
+        file_path = temp_dir / "follow.jsonl"
+        _append(file_path, _line(0) + _line(1))
+        offset = len(_line(0))
+        with JsonlFollower(file_path, offset=offset) as follower:
+            assert follower.read_new() == [{"id": 1}]
+        with JsonlFollower(file_path, from_end=True) as follower:
+            assert follower.read_new() == []
+            _append(file_path, _line(2))
+            assert follower.read_new() == [{"id": 2}]
+
+    def test_truncation(self, temp_dir):
+        """测试文件被截断后从头读取"""
+        file_path = temp_dir / "follow.jsonl"
+        _append(file_path, _line(0) + _line(1))
+        with JsonlFollower(file_path) as follower:
+            follower.read_new()
+            _append(file_path, _line(5), mode="w")
+            assert follower.read_new() == [{"id": 5}]
+
+    def test_rotation(self, temp_dir):
+        """测试轮转时先读完旧文件再读取新文件"""
+        file_path = temp_dir / "follow.jsonl"
+        _append(file_path, _line(0))
+        with JsonlFollower(file_path) as follower:
+            assert follower.read_new() == [{"id": 0}]
+            _append(file_path, _line(1))
+            os.rename(file_path, temp_dir / "follow.jsonl.1")
+            _append(file_path, _line(2) + _line(3))
+            assert follower.read_new() == [{"id": 1}, {"id": 2}, {"id": 3}]
+
+    def test_bounded_block(self, temp_dir):
+        """测试积压的数据按 block_size 分多次读取，超过 block_size 的单行完整读取"""
+        file_path = temp_dir / "follow.jsonl"
+        long_line = json.dumps({"id": -1, "text": "x" * 200}) + "\n"
+        _append(file_path, "".join(_line(i) for i in range(100)) + long_line + _line(100))
+        with JsonlFollower(file_path, block_size=64) as follower:
+            batches = []
+            while items := follower.read_new():
+                batches.append(items)
+            assert len(batches) > 10
+            assert max(len(items) for items in batches) <= 64 // len(_line(0)) + 1
+            result = [item["id"] for items in batches for item in items]
+            assert result == list(range(100)) + [-1, 100]
+            assert follower.offset == file_path.stat().st_size
+
+    def test_rotation_bounded(self, temp_dir):
+        """测试轮转时旧文件剩余的数据较多时同样分块读完"""
+        file_path = temp_dir / "follow.jsonl"
+        with JsonlFollower(file_path, block_size=32) as follower:
+            _append(file_path, _line(0))
+            assert follower.read_new() == [{"id": 0}]
+            _append(file_path, "".join(_line(i) for i in range(1, 20)) + '{"id": 20}')
+            os.rename(file_path, temp_dir / "follow.jsonl.1")
+            _append(file_path, _line(21))
+            result = []
+            while items := follower.read_new():
+                result.extend(item["id"] for item in items)
+            assert result == list(range(1, 22))
+
+    def test_follow_file(self, temp_dir):
+        """测试 follow_file 跟随写入线程，超时后结束"""
+        file_path = temp_dir / "follow.jsonl"
+
+        def writer():
+            for i in range(5):
+                _append(file_path, _line(i))
+                time.sleep(0.02)
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        result = list(follow_file(file_path, poll_interval=0.01, timeout=0.5, process_fn=lambda x: x["id"] if x["id"] % 2 == 0 else None))
+        thread.join()
+        assert result == [0, 2, 4]
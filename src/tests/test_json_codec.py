@@ -0,0 +1,79 @@
+import json
+import datetime
+import pytest
+from bedrockx import set_json_backend, get_json_backend, read_file, save_file
+from bedrockx.utils.json_codec import get_json_codec, register_json_backend, JsonCodec
+
+
+@pytest.fixture(autouse=True)
+def reset_backend():
+    """每个测试结束后恢复标准库后端"""
+    yield
+    set_json_backend("json")
+
+
+class TestJsonCodec:
+    """测试可切换的 json 后端"""
+
+    @pytest.mark.parametrize("backend", ["json", "orjson", "msgspec"])
+    def test_roundtrip(self, backend, temp_dir, sample_data):
+        """测试各后端读写结果一致"""
+        pytest.importorskip(backend)
+        assert set_json_backend(backend) == backend
+        assert get_json_backend() == backend
+
+        file_path = temp_dir / "output.jsonl"
+        save_file(file_path, sample_data)
+        assert read_file(file_path) == sample_data
+
+    @pytest.mark.parametrize("backend", ["orjson", "msgspec"])
+    def test_dumps_matches_stdlib(self, backend):
+        """测试 ensure_ascii、非 str key 与 default=str 的行为与标准库一致"""
+        pytest.importorskip(backend)
+        codec = get_json_codec(backend)
+        obj = {"名字": "中文", 1: "int key", "big": 2 ** 70, "obj": object}
+        for ensure_ascii in (True, False):
+            assert json.loads(codec.dumps(obj, ensure_ascii)) == json.loads(json.dumps(obj, ensure_ascii=ensure_ascii, default=str))
+        assert "中文" in codec.dumps(obj, False)
+        assert "中文" not in codec.dumps(obj, True)
+
+    @pytest.mark.parametrize("backend", ["orjson", "msgspec"])
+    def test_numpy_and_decimal_parity(self, backend):
+        """测试 numpy 标量、数组与 Decimal 的输出与标准库一致，np.float64 保持为数字"""
+        pytest.importorskip(backend)
+        import decimal
+        import numpy as np
+
+        obj = {
+            "f64": np.float64(1.5), "f32": np.float32(1.5), "i64": np.int64(3), "bool": np.bool_(True),
+            "arr": np.array([1, 2]), "dec": decimal.Decimal("1.1"), "nested": [{"x": np.float64(-2.25)}],
+        }
+        stdlib = get_json_codec("json")
+        for ensure_ascii in (True, False):
+            assert json.loads(get_json_codec(backend).dumps(obj, ensure_ascii)) == json.loads(stdlib.dumps(obj, ensure_ascii))
+        result = json.loads(get_json_codec(backend).dumps(obj))
+        assert result["f64"] == 1.5 and result["nested"][0]["x"] == -2.25
+
+    def test_orjson_datetime_uses_str(self):
+        """测试 orjson 后端的 datetime 与 default=str 结果一致"""
+        pytest.importorskip("orjson")
+        value = {"time": datetime.datetime(2025, 1, 1, 8, 0, 0)}
+        assert json.loads(get_json_codec("orjson").dumps(value)) == {"time": "2025-01-01 08:00:00"}
+
+    def test_missing_backend_falls_back(self, monkeypatch):
+        """测试依赖缺失时回退为标准库"""
+        def broken():
+            raise ImportError("missing")
+        register_json_backend("broken", broken)
+        assert set_json_backend("broken") == "json"
+
+    def test_unknown_backend(self):
+        """测试不存在的后端"""
+        with pytest.raises(RuntimeError, match="不支持的 json 后端"):
+            set_json_backend("unknown")
+
+    def test_custom_backend(self):
+        """测试注册自定义后端"""
+        register_json_backend("custom", lambda: JsonCodec("custom", json.loads, lambda obj, ensure_ascii=False: json.dumps(obj, sort_keys=True)))
+        set_json_backend("custom")
+        assert get_json_codec().dumps({"b": 1, "a": 2}) == '{"a": 2, "b": 1}'
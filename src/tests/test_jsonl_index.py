@@ -0,0 +1,106 @@
+import os
+import json
+import pytest
+from bedrockx.file import JsonlIndex, read_file
+
+
+@pytest.fixture
+def indexed_file(temp_dir):
+    """创建带空行、无结尾换行的 jsonl 文件"""
+    file_path = temp_dir / "index.jsonl"
+    lines = [json.dumps({"id": i, "text": "文本" * i}, ensure_ascii=False) for i in range(20)]
+    content = "\n".join(lines[:10]) + "\n\n   \n" + "\n".join(lines[10:])
+    file_path.write_text(content, encoding="utf-8")
+    return file_path
+
+
+class TestJsonlIndex:
+    """测试 JsonlIndex 行偏移索引"""
+
+    def test_len_and_getitem(self, indexed_file):
+        """测试 len、下标与负下标访问，空行不计入"""
+        with JsonlIndex(indexed_file) as index:
+            assert len(index) == 20
+            assert index[0]["id"] == 0
+            assert index[19]["id"] == 19
+            assert index[-1]["id"] == 19
+            with pytest.raises(IndexError):
+                index[20]
+
+    def test_slice_and_iter(self, indexed_file):
+        """测试切片与遍历"""
+        with JsonlIndex(indexed_file) as index:
+            assert [item["id"] for item in index[8:12]] == [8, 9, 10, 11]
+            assert [item["id"] for item in index[::5]] == [0, 5, 10, 15]
+            assert list(index) == read_file(indexed_file)
+
+    def test_sample(self, indexed_file):
+        """测试随机采样"""
+        with JsonlIndex(indexed_file) as index:
+            result = index.sample(5, seed=0)
+            assert len({item["id"] for item in result}) == 5
+            assert result == index.sample(5, seed=0)
+
+    def test_sidecar_reuse_and_invalidation(self, indexed_file):
+        """测试索引文件复用，以及源文件变化后失效重建"""
+        JsonlIndex(indexed_file).close()
+        index_path = JsonlIndex.default_index_path(indexed_file)
+        assert index_path.exists()
+        assert len(JsonlIndex.load_if_fresh(indexed_file)) == 20
+        assert JsonlIndex.fresh_count(indexed_file) == 20
+
+        with open(indexed_file, "a", encoding="utf-8") as f:
+            f.write('\n{"id": 20}\n')
+        stat = indexed_file.stat()
+        os.utime(indexed_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        assert JsonlIndex.load_if_fresh(indexed_file) is None
+        assert JsonlIndex.fresh_count(indexed_file) is None
+        with JsonlIndex(indexed_file) as index:
+            assert len(index) == 21
+            assert index[20] == {"id": 20}
+
+    def test_read_file_uses_index_for_total(self, indexed_file, monkeypatch):
+        """测试存在索引时 read_file 不再扫描文件计算行数"""
+        JsonlIndex(indexed_file).close()
+        monkeypatch.setattr(JsonlIndex, "_build", lambda self: pytest.fail("不应重新扫描"))
+        # 行数只读取索引文件头，不加载偏移数组
+        monkeypatch.setattr(JsonlIndex, "_load", lambda *args: pytest.fail("不应加载偏移数组"))
+        assert len(read_file(indexed_file, count_lines=True)) == 20
+
+    def test_file_grows_during_build(self, indexed_file, monkeypatch):
+        """测试扫描过程中文件被追加时，索引不会被当作最新"""
+        original_build = JsonlIndex._build
+
+        def build_then_append(self):
+            offsets = original_build(self)
+            with open(self.file_name, "a", encoding="utf-8") as f:
+                f.write('\n{"id": 20}\n')
+            return offsets
+
+        monkeypatch.setattr(JsonlIndex, "_build", build_then_append)
+        JsonlIndex(indexed_file).close()
+        monkeypatch.undo()
+        assert JsonlIndex.fresh_count(indexed_file) is None
+        with JsonlIndex(indexed_file) as index:
+            assert len(index) == 21
+
+    def test_unwritable_sidecar(self, indexed_file, temp_dir, monkeypatch):
+        """测试索引文件无法写入时仍然可以使用内存中的索引，且不留下临时文件"""
+        with JsonlIndex(indexed_file, index_path=temp_dir / "missing" / "data.idx") as index:
+            assert len(index) == 20
+
+        def read_only(src, dst):
+            raise PermissionError("只读目录")
+
+        monkeypatch.setattr(os, "replace", read_only)
+        with JsonlIndex(indexed_file) as index:
+            assert index[19]["id"] == 19
+        assert sorted(p.name for p in temp_dir.iterdir()) == [indexed_file.name]
+
+    def test_empty_file(self, temp_dir):
+        """测试空文件"""
+        empty = temp_dir / "empty.jsonl"
+        empty.touch()
+        with JsonlIndex(empty) as index:
+            assert len(index) == 0
+            assert index[:] == []
@@ -1,3 +1,4 @@
+import os
 import pytest
 import time
 from pathlib import Path
@@ -5,6 +6,141 @@ from bedrockx.process import BaseMultiThreading
 from bedrockx.file import read_file
 
 
+class CpuProcessor(BaseMultiThreading):
+    """backend="process" 的测试处理器，需要定义在模块顶层才能被 pickle"""
+
+    def post_init(self, offset=0, **kwargs):
+        self.worker_pid = os.getpid()
+        self.offset = offset
+
+    def single_data_process(self, item):
+        return {"id": item["id"], "value": sum(range(item["id"])) + self.offset, "pid": self.worker_pid}
+
+
+class TestProcessBackend:
+    """测试进程池后端"""
+
+    def test_results_and_worker_post_init(self, temp_dir):
+        """测试 post_init 只在子进程中执行，结果由主进程写入"""
+        save_path = temp_dir / "output.jsonl"
+        processor = CpuProcessor(max_workers=2, save_path=save_path, backend="process", chunk_size=7, offset=1)
+        assert not hasattr(processor, "worker_pid")
+        processor(({"id": i} for i in range(100)))
+
+        result = sorted(read_file(save_path), key=lambda x: x["id"])
+        assert [item["value"] for item in result] == [sum(range(i)) + 1 for i in range(100)]
+        assert os.getpid() not in {item["pid"] for item in result}
+
+    def test_sharded_and_continue(self, temp_dir):
+        """测试进程池后端与分片写入、continue_save 组合"""
+        save_path = temp_dir / "output.jsonl"
+        CpuProcessor(max_workers=2, save_path=save_path, backend="process", shard_rows=30)([{"id": i} for i in range(50)])
+        CpuProcessor(max_workers=2, save_path=save_path, backend="process", shard_rows=30, continue_save=True)([{"id": 50}])
+        result = read_file(temp_dir / "output_manifest.json")
+        assert sorted(item["id"] for item in result) == list(range(51))
+
+    def test_invalid_backend(self, temp_dir):
+        """测试无效的 backend"""
+        with pytest.raises(RuntimeError, match="backend 参数错误"):
+            CpuProcessor(max_workers=2, save_path=temp_dir / "output.jsonl", backend="gpu")
+
+
+class RecordingProcessor(BaseMultiThreading):
+    """记录实际处理过的数据，用于验证 resume_key 跳过了已完成的数据"""
+
+    def post_init(self, **kwargs):
+        self.processed = []
+
+    def single_data_process(self, item):
+        self.processed.append(item["id"])
+        return {"id": item["id"], "value": item["id"] * 2}
+
+
+class TestResume:
+    """测试 continue_save + resume_key 断点续跑"""
+
+    def test_skip_done_and_torn_line(self, temp_dir):
+        """测试跳过已处理的数据，并截断中断时写了一半的最后一行"""
+        save_path = temp_dir / "output.jsonl"
+        with open(save_path, "w", encoding="utf-8") as f:
+            for i in range(50):
+                f.write(f'{{"id": {i}, "value": {i * 2}}}\n')
+            f.write('{"id": 50, "val')
+
+        processor = RecordingProcessor(max_workers=4, save_path=save_path, continue_save=True, resume_key="id")
+        processor(({"id": i} for i in range(100)))
+        assert sorted(processor.processed) == list(range(50, 100))
+
+        result = read_file(save_path)
+        assert sorted(item["id"] for item in result) == list(range(100))
+        assert all(item["value"] == item["id"] * 2 for item in result)
+
+    def test_sharded_resume(self, temp_dir):
+        """测试分片写入时扫描所有分片"""
+        save_path = temp_dir / "output.jsonl"
+        RecordingProcessor(max_workers=2, save_path=save_path, shard_rows=10)([{"id": i} for i in range(25)])
+        with open(temp_dir / "output_part-00002.jsonl", "a", encoding="utf-8") as f:
+            f.write('{"id": 2')
+
+        processor = RecordingProcessor(max_workers=2, save_path=save_path, shard_rows=10, continue_save=True, resume_key="id", resume_workers=2)
+        processor([{"id": i} for i in range(30)])
+        assert sorted(processor.processed) == list(range(25, 30))
+        result = read_file(temp_dir / "output_manifest.json")
+        assert sorted(item["id"] for item in result) == list(range(30))
+
+    def test_complete_last_line_without_newline(self, temp_dir):
+        """测试最后一行完整但缺少换行符时补上换行符，不会被截断"""
+        save_path = temp_dir / "output.jsonl"
+        save_path.write_text('{"id": 0}\n{"id": 1}', encoding="utf-8")
+        RecordingProcessor(max_workers=2, save_path=save_path, continue_save=True)([{"id": 2}])
+        assert [item["id"] for item in read_file(save_path)] == [0, 1, 2]
+
+        save_path.write_text('{"id": 0}\n{"id": 1}', encoding="utf-8")
+        processor = RecordingProcessor(max_workers=2, save_path=save_path, continue_save=True, resume_key="id")
+        processor([{"id": i} for i in range(3)])
+        assert processor.processed == [2]
+
+    def test_null_and_keyless_rows(self, temp_dir):
+        """测试输出中为 null 或缺少 resume_key 的行被跳过，不影响扫描"""
+        save_path = temp_dir / "output.jsonl"
+        save_path.write_text('{"id": 0}\nnull\n{"other": 1}\n{"id": 1}\n', encoding="utf-8")
+        for resume_workers in (None, 2):
+            processor = RecordingProcessor(max_workers=2, save_path=save_path, continue_save=True, resume_key="id", resume_workers=resume_workers)
+            processor([{"id": i} for i in range(3)])
+            assert processor.processed == [2]
+            save_path.write_text('{"id": 0}\nnull\n{"other": 1}\n{"id": 1}\n', encoding="utf-8")
+
+    def test_compressed_shards_resume(self, temp_dir):
+        """测试压缩分片续跑时不会被当作不完整的行截断"""
+        save_path = temp_dir / "output.jsonl.gz"
+        RecordingProcessor(max_workers=2, save_path=save_path, file_type="jsonl", shard_rows=10)([{"id": i} for i in range(25)])
+        sizes = {path.name: path.stat().st_size for path in temp_dir.glob("output_part-*")}
+
+        processor = RecordingProcessor(max_workers=2, save_path=save_path, file_type="jsonl", shard_rows=10, continue_save=True, resume_key="id")
+        processor([{"id": i} for i in range(30)])
+        assert sorted(processor.processed) == list(range(25, 30))
+        for name in ("output_part-00000.jsonl.gz", "output_part-00001.jsonl.gz"):
+            assert (temp_dir / name).stat().st_size == sizes[name]
+        result = read_file(temp_dir / "output_manifest.json")
+        assert sorted(item["id"] for item in result) == list(range(30))
+
+    def test_no_existing_output(self, temp_dir):
+        """测试输出文件不存在时正常处理所有数据"""
+        processor = RecordingProcessor(max_workers=2, save_path=temp_dir / "output.jsonl", continue_save=True, resume_key="id")
+        processor([{"id": i} for i in range(10)])
+        assert sorted(processor.processed) == list(range(10))
+
+    def test_invalid_arguments(self, temp_dir):
+        """测试 resume_key 缺少 continue_save，以及输入缺少 resume_key"""
+        save_path = temp_dir / "output.jsonl"
+        with pytest.raises(RuntimeError, match="continue_save"):
+            RecordingProcessor(max_workers=2, save_path=save_path, resume_key="id")
+        save_path.write_text('{"id": 0}\n', encoding="utf-8")
+        processor = RecordingProcessor(max_workers=2, save_path=save_path, continue_save=True, resume_key="id")
+        with pytest.raises(RuntimeError, match="resume_key"):
+            processor([{"name": "a"}])
+
+
 class TestMultiThreading:
     """测试 BaseMultiThreading 类"""
     
@@ -71,6 +207,56 @@ class TestMultiThreading:
             })
             TestProcessor(max_workers=2, save_path=save_path)
     
+    def test_generator_input_bounded(self, temp_dir):
+        """测试生成器输入，在途任务数不超过 max_in_flight"""
+        import threading
+
+        lock = threading.Lock()
+        state = {"consumed": 0, "finished": 0, "max_gap": 0}
+
+        class TestProcessor(BaseMultiThreading):
+            def single_data_process(self, item):
+                time.sleep(0.002)
+                with lock:
+                    state["finished"] += 1
+                return item
+
+        def gen():
+            for i in range(100):
+                with lock:
+                    # 已读取但未完成的任务数（含当前这条）
+                    state["max_gap"] = max(state["max_gap"], state["consumed"] - state["finished"])
+                    state["consumed"] += 1
+                yield {"id": i}
+
+        save_path = temp_dir / "output.jsonl"
+        TestProcessor(max_workers=3, save_path=save_path, max_in_flight=6)(gen())
+
+        result = read_file(save_path)
+        assert sorted(item["id"] for item in result) == list(range(100))
+        assert state["max_gap"] <= 6
+
+    def test_sharded_output(self, temp_dir):
+        """测试分片写入与 continue_save 接着写入"""
+
+        class TestProcessor(BaseMultiThreading):
+            def single_data_process(self, item):
+                return item
+
+        save_path = temp_dir / "output.jsonl"
+        TestProcessor(max_workers=2, save_path=save_path, shard_rows=3)([{"id": i} for i in range(7)])
+        TestProcessor(max_workers=2, save_path=save_path, shard_rows=3, continue_save=True)([{"id": i} for i in range(7, 9)])
+
+        result = read_file(temp_dir / "output_manifest.json")
+        assert sorted(item["id"] for item in result) == list(range(9))
+        assert len(list(temp_dir.glob("output_part-*.jsonl"))) == 3
+
+    @pytest.mark.parametrize("suffix", [".parquet", ".arrow", ".csv"])
+    def test_known_but_unsupported_file_type(self, temp_dir, suffix):
+        """测试可识别但暂不支持边处理边存储的格式"""
+        with pytest.raises(ValueError, match="暂时不支持"):
+            BaseMultiThreading(max_workers=2, save_path=temp_dir / f"output{suffix}")
+
     def test_not_implemented_error(self, temp_dir):
         """测试未实现 single_data_process"""
         save_path = temp_dir / "output.jsonl"
@@ -0,0 +1,72 @@
+import json
+import pytest
+from bedrockx.file import ShardedWriter, read_file, save_file
+
+
+def _data(n, start=0):
+    return [{"id": i, "text": f"文本{i}"} for i in range(start, start + n)]
+
+
+class TestShardedWriter:
+    """测试按行数/字节数滚动的分片写入"""
+
+    def test_roll_over_by_rows(self, temp_dir):
+        """测试按行数滚动，manifest 记录每个分片的行数"""
+        base = temp_dir / "data.jsonl"
+        with ShardedWriter(base, shard_rows=4) as writer:
+            writer.write_many(_data(10))
+
+        assert [p.name for p in sorted(temp_dir.glob("data_part-*.jsonl"))] == [
+            "data_part-00000.jsonl", "data_part-00001.jsonl", "data_part-00002.jsonl"
+        ]
+        manifest = json.loads((temp_dir / "data_manifest.json").read_text(encoding="utf-8"))
+        assert [shard["rows"] for shard in manifest["shards"]] == [4, 4, 2]
+        assert manifest["total_rows"] == 10
+        assert not base.exists()
+
+    def test_roll_over_by_bytes(self, temp_dir):
+        """测试按字节数滚动，单个分片不超过 shard_bytes"""
+        with ShardedWriter(temp_dir / "data.jsonl", shard_bytes=100) as writer:
+            writer.write_many(_data(20))
+        for shard in writer.shards:
+            assert shard["bytes"] <= 100
+            assert (temp_dir / shard["file"]).stat().st_size == shard["bytes"]
+        assert writer.total_rows == 20
+
+    def test_read_back(self, temp_dir):
+        """测试通过 manifest、目录与 glob 读取全部分片"""
+        save_file(temp_dir / "data.jsonl", _data(10), shard_rows=3)
+        assert read_file(temp_dir / "data_manifest.json") == _data(10)
+        assert read_file(temp_dir) == _data(10)
+        assert read_file(str(temp_dir / "data_part-*.jsonl"), num_workers=2) == _data(10)
+
+    def test_ordinary_file_named_manifest(self, temp_dir):
+        """测试文件名以 _manifest.json 结尾的普通 json 不会被当作 manifest"""
+        save_file(temp_dir / "model_manifest.json", _data(3))
+        assert read_file(temp_dir / "model_manifest.json") == _data(3)
+        save_file(temp_dir / "data.json", _data(2, start=3))
+        assert read_file(temp_dir, file_type="json") == _data(2, start=3) + _data(3)
+
+    def test_compressed_shards(self, temp_dir):
+        """测试压缩分片的命名与读取"""
+        save_file(temp_dir / "data.jsonl.gz", _data(5), shard_rows=2)
+        assert (temp_dir / "data_part-00002.jsonl.gz").exists()
+        assert read_file(temp_dir / "data_manifest.json") == _data(5)
+
+    def test_resume(self, temp_dir):
+        """测试 resume 时最后一个未写满的分片继续追加"""
+        base = temp_dir / "data.jsonl"
+        with ShardedWriter(base, shard_rows=4) as writer:
+            writer.write_many(_data(6))
+        with ShardedWriter(base, shard_rows=4, resume=True) as writer:
+            writer.write_many(_data(5, start=6))
+
+        assert [shard["rows"] for shard in writer.shards] == [4, 4, 3]
+        assert read_file(temp_dir / "data_manifest.json") == _data(11)
+
+    def test_invalid_arguments(self, temp_dir):
+        """测试缺少滚动条件或非 jsonl 格式"""
+        with pytest.raises(RuntimeError, match="shard_rows 或 shard_bytes"):
+            ShardedWriter(temp_dir / "data.jsonl")
+        with pytest.raises(RuntimeError, match="仅支持 jsonl"):
+            save_file(temp_dir / "data.csv", _data(2), shard_rows=1)